@@ -0,0 +1,112 @@
+"""Frame scheduling for the lottery popup on the Tk event loop
+
+Everything here runs through widget.after, so all Tk calls stay on the main
+thread; nothing sleeps or touches widgets from worker threads.
+"""
+import time
+
+
+class FrameStats:
+    """Frame counters for one animation"""
+
+    def __init__(self, fps):
+        self.fps = fps
+        self.frames = 0
+        self.dropped = 0
+        self.max_late_ms = 0.0
+
+    def __repr__(self):
+        return (f"FrameStats(fps={self.fps}, frames={self.frames}, "
+                f"dropped={self.dropped}, max_late_ms={self.max_late_ms:.1f})")
+
+
+class Animation:
+    """Calls tick(frame) at a fixed frame rate until stopped or duration runs out
+
+    Frames are scheduled against an ideal timeline rather than "interval after
+    the last frame", so slow frames do not make the animation drift; frames
+    that could not be shown in time are counted as dropped and skipped.
+    """
+
+    def __init__(self, widget, tick, fps, duration=None, on_done=None):
+        self.widget = widget
+        self.tick = tick
+        self.interval = 1.0 / fps
+        self.duration = duration
+        self.on_done = on_done
+        self.stats = FrameStats(fps)
+        self.running = False
+        self._after_id = None
+        self._start = None
+        self._frame = 0
+
+    def start(self):
+        self.running = True
+        self._start = time.perf_counter()
+        self._frame = 0
+        self._run()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self._after_id is not None:
+            try:
+                self.widget.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+
+    def _run(self):
+        self._after_id = None
+        if not self.running:
+            return
+        if not self.widget.winfo_exists():
+            self.stop()
+            return
+
+        now = time.perf_counter()
+        elapsed = now - self._start
+        if self.duration is not None and elapsed >= self.duration:
+            self.stop()
+            if self.on_done is not None:
+                self.on_done()
+            return
+
+        due_frame = int(elapsed / self.interval)
+        if due_frame > self._frame:
+            # We are late: skip the frames that should already have been shown
+            self.stats.dropped += due_frame - self._frame
+            self._frame = due_frame
+        late_ms = (elapsed - self._frame * self.interval) * 1000
+        self.stats.max_late_ms = max(self.stats.max_late_ms, late_ms)
+
+        self.stats.frames += 1
+        if self.tick(self._frame) is False:
+            self.stop()
+            return
+
+        self._frame += 1
+        next_due = self._start + self._frame * self.interval
+        if self.duration is not None:
+            next_due = min(next_due, self._start + self.duration)
+        delay = max(1, int((next_due - time.perf_counter()) * 1000))
+        self._after_id = self.widget.after(delay, self._run)
+
+
+class AnimationScheduler:
+    """Owns the animations of one window and cancels them together"""
+
+    def __init__(self, widget):
+        self.widget = widget
+        self.animations = []
+
+    def animate(self, tick, fps, duration=None, on_done=None):
+        """Start an animation, see Animation for the arguments"""
+        animation = Animation(self.widget, tick, fps, duration, on_done)
+        self.animations.append(animation)
+        return animation.start()
+
+    def cancel_all(self):
+        for animation in self.animations:
+            animation.stop()
+        self.animations = []
@@ -0,0 +1,767 @@
+"""Benchmarks for the lottery app
+
+Usage:
+    python bench.py load [rows ...]
+    python bench.py draw [entries] [winners]
+    python bench.py mask [rows]
+    python bench.py memory [rows]
+    python bench.py formats [rows]
+    python bench.py sheets [rows] [sheets]
+    python bench.py dedup [rows]
+    python bench.py weighted [entries] [winners]
+    python bench.py weighted-check [trials]
+    python bench.py registry [winners] [entries]
+    python bench.py startup [top]
+    python bench.py replay [entries] [winners]
+    python bench.py winners-search [winners]
+    python bench.py export [rows] [draws]
+    python bench.py suite [rows ...]
+
+Each measurement runs in a fresh child process so peak RSS is not polluted by
+earlier runs.
+"""
+import os
+import random
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_data")
+DEFAULT_LOAD_SIZES = [100_000, 1_000_000, 5_000_000]
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB, nan where it cannot be read
+
+    The resource module is Unix only; on Windows the peak working set comes
+    from psutil when it is installed.
+    """
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return float("nan")
+        return psutil.Process().memory_info().peak_wset / 2**20
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def make_raw_entries(count, seed=0):
+    """Build synthetic (name, national_id, phone) rows in memory"""
+    rng = random.Random(seed)
+    return [
+        (f"شرکت‌کننده {i}", f"{i:010d}", f"09{rng.randrange(10**9):09d}")
+        for i in range(count)
+    ]
+
+
+def make_entries(count, seed=0):
+    """Build synthetic participant entries as the loader produces them"""
+    from phones import normalize_phones
+
+    raw = make_raw_entries(count, seed)
+    phones, masked = normalize_phones([phone for _, _, phone in raw])
+    return [(name, nid, phone, m) for (name, nid, _), phone, m in zip(raw, phones, masked)]
+
+
+def make_participant_xlsx(rows, path):
+    """Write a synthetic participant workbook with openpyxl's write-only mode"""
+    from openpyxl import Workbook
+
+    rng = random.Random(rows)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Participants")
+    for i in range(rows):
+        ws.append([
+            f"شرکت‌کننده {i}",
+            f"{rng.randrange(10**10):010d}",
+            f"09{rng.randrange(10**9):09d}",
+        ])
+    wb.save(path)
+
+
+def participant_file(rows):
+    """Return the path of a cached synthetic workbook with the given row count"""
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    path = os.path.join(BENCH_DIR, f"participants_{rows}.xlsx")
+    if not os.path.exists(path):
+        print(f"Generating {path} ...")
+        make_participant_xlsx(rows, path)
+    return path
+
+
+def _child_load(mode, path):
+    """Runs inside the child process: load path and print the elapsed time"""
+    start = time.perf_counter()
+    if mode == "full":
+        # The pre-streaming behaviour: whole workbook in edit mode
+        from openpyxl import load_workbook
+        wb = load_workbook(path)
+        count = sum(1 for _ in wb.active.iter_rows(values_only=True))
+    else:
+        from loader import load_participants
+        entries, _ = load_participants(path)
+        count = len(entries)
+    elapsed = time.perf_counter() - start
+    peak_mb = peak_rss_mb()
+    print(f"{count} {elapsed:.3f} {peak_mb:.1f}")
+
+
+def run_child(*args):
+    """Run this script in a child process and return the fields of its last output line"""
+    out = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "_child", *args],
+        check=True, capture_output=True, text=True,
+    ).stdout.strip().splitlines()[-1]
+    return out.split()
+
+
+def bench_load(sizes):
+    print(f"{'rows':>10} {'mode':>7} {'seconds':>9} {'rows/s':>10} {'peak MB':>9}")
+    for rows in sizes:
+        path = participant_file(rows)
+        for mode in ("stream", "full"):
+            count, seconds, peak_mb = run_child("load", mode, path)
+            seconds, peak_mb = float(seconds), float(peak_mb)
+            print(f"{rows:>10} {mode:>7} {seconds:>9.2f} {int(count) / seconds:>10.0f} {peak_mb:>9.0f}")
+
+
+def bench_draw(entries=5_000_000, winners=10_000):
+    from draw_engine import DrawEngine
+    from pool import ParticipantPool
+
+    data = make_entries(entries)
+    start = time.perf_counter()
+    pool = ParticipantPool(data)
+    build = time.perf_counter() - start
+    print(f"pool of {entries} built in {build:.2f}s")
+
+    engine = DrawEngine(pool, random.Random(1))
+    start = time.perf_counter()
+    engine.draw(winners)
+    print(f"single draw of {winners}: {time.perf_counter() - start:.3f}s")
+
+    rounds = [("grand", 1), ("second", 10), ("consolation", winners - 11)]
+    start = time.perf_counter()
+    engine.draw_rounds(rounds)
+    print(f"rounds {rounds}: {time.perf_counter() - start:.3f}s")
+
+
+def bench_mask(rows=1_000_000):
+    from phones import mask_phone, normalize_phone, normalize_phones
+
+    phones = [phone for _, _, phone in make_raw_entries(rows)]
+    start = time.perf_counter()
+    scalar = [(normalize_phone(p), mask_phone(p)) for p in phones]
+    scalar_time = time.perf_counter() - start
+    start = time.perf_counter()
+    normalized, masked = normalize_phones(phones)
+    batch_time = time.perf_counter() - start
+    assert list(zip(normalized, masked)) == scalar
+    print(f"{rows} phones: per-value {scalar_time:.2f}s, batched {batch_time:.2f}s "
+          f"({scalar_time / batch_time:.1f}x)")
+
+
+def bench_memory(rows=1_000_000):
+    import tracemalloc
+    from store import ParticipantStore
+
+    raw = make_raw_entries(rows)
+    tracemalloc.start()
+    entries = make_entries(rows)
+    tuples_mb = tracemalloc.get_traced_memory()[0] / 2**20
+    del entries
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    store = ParticipantStore(raw)
+    store_mb = tracemalloc.get_traced_memory()[0] / 2**20
+    tracemalloc.stop()
+    print(f"{rows} participants: list of tuples {tuples_mb:.0f} MB, "
+          f"ParticipantStore {store_mb:.0f} MB ({tuples_mb / store_mb:.1f}x smaller)")
+    assert store[rows - 1][:3] == raw[rows - 1]
+
+
+def write_format(rows, extension, path):
+    """Write the make_raw_entries dataset in the given format"""
+    raw = make_raw_entries(rows)
+    if extension in (".csv", ".tsv"):
+        import csv
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            csv.writer(f, delimiter="\t" if extension == ".tsv" else ",").writerows(raw)
+    elif extension == ".parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        columns = list(zip(*raw))
+        pq.write_table(pa.table({"name": columns[0], "national_id": columns[1], "phone": columns[2]}), path)
+    elif extension == ".xlsx":
+        from openpyxl import Workbook
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Participants")
+        for row in raw:
+            ws.append(row)
+        wb.save(path)
+
+
+def bench_formats(rows=1_000_000):
+    from loader import load_participants
+
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    print(f"{'format':>9} {'seconds':>9} {'rows/s':>10}")
+    for extension in (".csv", ".tsv", ".parquet", ".xlsx"):
+        path = os.path.join(BENCH_DIR, f"participants_{rows}{extension}")
+        try:
+            if not os.path.exists(path):
+                write_format(rows, extension, path)
+            start = time.perf_counter()
+            entries, _ = load_participants(path, cache_dir=None)
+            seconds = time.perf_counter() - start
+        except ImportError as e:
+            print(f"{extension:>9} skipped: {e}")
+            continue
+        assert len(entries) == rows
+        print(f"{extension:>9} {seconds:>9.2f} {rows / seconds:>10.0f}")
+
+
+def bench_sheets(rows=1_000_000, sheets=8):
+    from openpyxl import Workbook
+    from loader import load_participants
+
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    path = os.path.join(BENCH_DIR, f"participants_{rows}_{sheets}sheets.xlsx")
+    if not os.path.exists(path):
+        print(f"Generating {path} ...")
+        wb = Workbook(write_only=True)
+        raw = make_raw_entries(rows)
+        per_sheet = -(-rows // sheets)
+        for n in range(sheets):
+            ws = wb.create_sheet(f"Region {n + 1}")
+            for row in raw[n * per_sheet:(n + 1) * per_sheet]:
+                ws.append(row)
+        wb.save(path)
+
+    baseline = None
+    reference = None
+    print(f"{'workers':>8} {'seconds':>9} {'speedup':>8}")
+    for workers in sorted({1, 2, 4, min(8, os.cpu_count() or 1), os.cpu_count() or 1}):
+        start = time.perf_counter()
+        entries, _ = load_participants(path, cache_dir=None, workers=workers)
+        seconds = time.perf_counter() - start
+        baseline = baseline or seconds
+        # Every worker count must give the same entries in the same order
+        reference = reference or list(entries)
+        assert list(entries) == reference
+        print(f"{workers:>8} {seconds:>9.2f} {baseline / seconds:>7.1f}x")
+
+
+def _child_dedup(rows):
+    """Runs inside the child process so peak RSS covers only deduplication"""
+    from dedup import Deduplicator
+
+    rng = random.Random(rows)
+    # About one row in three repeats an earlier person
+    national_ids = [f"{rng.randrange(rows * 2 // 3):010d}" for _ in range(rows)]
+    before = peak_rss_mb()
+    start = time.perf_counter()
+    deduplicator = Deduplicator("weighted")
+    deduplicator.reserve(rows)
+    deduplicator.add(national_ids)
+    elapsed = time.perf_counter() - start
+    grown_mb = peak_rss_mb() - before
+    print(f"{deduplicator.table.size} {elapsed:.3f} {grown_mb:.1f}")
+
+
+def bench_dedup(rows=5_000_000):
+    unique, seconds, grown_mb = run_child("dedup", str(rows))
+    print(f"{rows} rows, {unique} people: {float(seconds):.2f}s, "
+          f"{float(seconds) and rows / float(seconds):.0f} rows/s, +{float(grown_mb):.0f} MB peak")
+
+
+def make_weighted_store(count, weights, seed=0):
+    """ParticipantStore of make_raw_entries rows with the given ticket counts (None for one each)"""
+    from store import ParticipantStore
+
+    names, national_ids, phones = zip(*make_raw_entries(count, seed))
+    store = ParticipantStore()
+    store.extend_columns(names, national_ids, phones, weights)
+    return store
+
+
+def bench_weighted(entries=5_000_000, winners=10_000):
+    from array import array
+    from draw_engine import DrawEngine
+    from pool import ParticipantPool
+
+    rng = random.Random(2)
+    # Mostly single tickets with a long tail of loyal customers
+    weights = array('I', (min(1000, int(rng.paretovariate(1.2))) for _ in range(entries)))
+    store = make_weighted_store(entries, weights)
+    engine = DrawEngine(ParticipantPool(store), random.Random(1))
+    start = time.perf_counter()
+    engine.draw(winners)
+    first = time.perf_counter() - start
+    start = time.perf_counter()
+    engine.draw(winners)
+    second = time.perf_counter() - start
+    print(f"{winners} winners from {entries} entries ({sum(weights)} tickets): "
+          f"first draw {first:.3f}s (builds the ticket table), second draw {second:.3f}s")
+
+
+def exact_inclusion(weights, k):
+    """Chance of each entry to be among k winners drawn one ticket at a time"""
+    from itertools import permutations
+
+    total = sum(weights)
+    inclusion = [0.0] * len(weights)
+    for order in permutations(range(len(weights)), k):
+        p = 1.0
+        left = total
+        for i in order:
+            p *= weights[i] / left
+            left -= weights[i]
+        for i in order:
+            inclusion[i] += p
+    return inclusion
+
+
+def bench_weighted_check(trials=100_000):
+    """Compare drawn winner frequencies with the exact probabilities
+
+    Each case prints the largest deviation in standard errors; anything below
+    about 4 is consistent with a correct sampler.
+    """
+    import math
+    from draw_engine import DrawEngine
+    from pool import ParticipantPool
+
+    weights = [1, 2, 3, 4, 10]
+    store = make_weighted_store(len(weights), weights)
+    rng = random.Random(3)
+    excluded = [store.national_id(4)]
+    plain = make_weighted_store(5, None)
+    plain_excluded = [plain.national_id(0), plain.national_id(1)]
+    cases = [
+        # k=3 takes most tickets, so the table is rebuilt during the call
+        ("sample 3 of 5", weights, 3, lambda: ParticipantPool(store).sample_indices(3, rng)),
+        # The excluded heavy entry and the first winner are rejected by the table
+        ("exclude 1, draw 1+1", weights[:4], 2,
+         lambda: _draw_twice(DrawEngine(ParticipantPool(store, excluded_ids=excluded), rng))),
+        # One ticket each: the table of remaining entries takes over after the exclusion
+        ("unweighted, exclude 2, sample 2", [1, 1, 1], 2,
+         lambda: [i - 2 for i in ParticipantPool(plain, excluded_ids=plain_excluded).sample_indices(2, rng)]),
+    ]
+    for label, case_weights, k, run in cases:
+        expected = exact_inclusion(case_weights, k)
+        counts = [0] * len(case_weights)
+        for _ in range(trials):
+            for i in run():
+                counts[i] += 1
+        worst = max(
+            abs(count / trials - p) / math.sqrt(p * (1 - p) / trials)
+            for count, p in zip(counts, expected) if 0 < p < 1
+        )
+        print(f"{label}: expected {[f'{p:.4f}' for p in expected]}, "
+              f"drawn {[f'{c / trials:.4f}' for c in counts]}, max deviation {worst:.2f} SE")
+        assert worst < 5, f"{label}: distribution is off"
+
+
+def _draw_twice(engine):
+    national_ids = [winner[1] for winner in engine.draw(1) + engine.draw(1)]
+    return [engine.pool.index_of(national_id) for national_id in national_ids]
+
+
+def bench_registry(winners=300_000, entries=5_000_000):
+    from registry import WinnerRegistry
+
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    path = os.path.join(BENCH_DIR, f"registry_{winners}.db")
+    if not os.path.exists(path):
+        print(f"Generating {path} ...")
+        # Every third participant of the store below has won before
+        WinnerRegistry(path).add_rows(
+            (f"برنده {i}", f"{i * 3:010d}", "4567***0912", "2025-01-01 12:00:00") for i in range(winners)
+        )
+    start = time.perf_counter()
+    registry = WinnerRegistry(path)
+    opened = time.perf_counter() - start
+
+    store = make_weighted_store(entries, None)
+    start = time.perf_counter()
+    excluded = registry.winner_indices(store)
+    matched = time.perf_counter() - start
+    assert len(excluded) == min(winners, -(-entries // 3))
+    print(f"registry of {winners} winners: opened in {opened * 1000:.1f} ms, "
+          f"{len(excluded)} of {entries} entries excluded in {matched:.2f}s")
+
+
+def bench_startup(top=15):
+    """Import ll the way a launch does and summarize python -X importtime"""
+    from ll import DEFERRED_MODULES
+
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import ll"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        print(result.stderr.strip().splitlines()[-1])
+        return
+    imports = {}
+    for line in result.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        imports[name.strip()] = int(cumulative)
+    print(f"import ll: {imports.get('ll', 0) / 1000:.1f} ms of imports, "
+          f"{wall * 1000:.0f} ms for the whole interpreter, {len(imports)} modules")
+    for name, cumulative in sorted(imports.items(), key=lambda item: -item[1])[:top]:
+        print(f"{cumulative / 1000:>9.1f} ms  {name}")
+    early = [name for name in DEFERRED_MODULES if name in imports]
+    print(f"deferred modules imported at startup: {', '.join(early) or 'none'}")
+
+
+def bench_replay(entries=5_000_000, winners=10_000):
+    """Record an audited draw on a participant file and time its replay"""
+    from audit import AuditLog, draw_rng, new_seed, replay
+    from dedup import DEFAULT_POLICY
+    from draw_engine import DrawEngine
+    from loader import load_participants
+    from pool import ParticipantPool
+
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    path = os.path.join(BENCH_DIR, f"participants_{entries}.csv")
+    if not os.path.exists(path):
+        write_format(entries, ".csv", path)
+    # Builds the snapshot the replay maps, like the original load in the app did
+    store, stats = load_participants(path)
+
+    log = AuditLog(os.path.join(BENCH_DIR, "audit.jsonl"))
+    load_id = log.record_load(path, stats.sha256, DEFAULT_POLICY, len(store), range(0, len(store), 7))
+    pool = ParticipantPool(store)
+    pool.remove_indices(range(0, len(store), 7))
+    seed = new_seed()
+    engine = DrawEngine(pool)
+    for _ in range(2):
+        draw_id = log.next_draw_id(load_id)
+        engine.rng = draw_rng(seed, stats.sha256, draw_id)
+        indices = engine.draw_indices(winners)
+        log.record_draw(load_id, draw_id, seed, indices, [store.national_id(i) for i in indices])
+
+    start = time.perf_counter()
+    matches, replayed, _ = replay(log, draw_id)
+    seconds = time.perf_counter() - start
+    assert matches
+    print(f"replayed draw {draw_id} ({winners} winners of {entries} entries, "
+          f"after an earlier draw and {len(range(0, len(store), 7))} exclusions) in {seconds:.2f}s")
+
+
+def bench_winners_search(winners=200_000, repeats=20):
+    """Time one page of each kind of registry search, as the winners browser runs them"""
+    from registry import WinnerRegistry
+    from winners_browser import PAGE_SIZE
+
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    path = os.path.join(BENCH_DIR, f"winners_search_{winners}.db")
+    first_names = ["علی", "محمد", "زهرا", "فاطمه", "حسین", "مریم", "رضا", "سارا"]
+    last_names = ["احمدی", "محمدی", "حسینی", "رضایی", "کریمی", "موسوی", "جعفری"]
+    if not os.path.exists(path):
+        print(f"Generating {path} ...")
+        rng = random.Random(0)
+        WinnerRegistry(path).add_rows(
+            (f"{rng.choice(first_names)} {rng.choice(last_names)} {i}", f"{i * 7:010d}",
+             f"09{rng.randrange(100):02d}***{rng.randrange(10000):04d}",
+             f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d} 12:00:00")
+            for i in range(winners)
+        )
+    registry = WinnerRegistry(path)
+    _, (row,) = registry.search(f"{first_names[0]} {last_names[0]}", 0, 1)
+    queries = [
+        ("all, first page", "", 0),
+        ("all, last page", "", winners - PAGE_SIZE),
+        ("name prefix", f"{first_names[0]} {last_names[0]}", 0),
+        ("national ID", row[1], 0),
+        ("masked phone", row[2], 0),
+    ]
+    for label, query, offset in queries:
+        start = time.perf_counter()
+        for _ in range(repeats):
+            total, rows = registry.search(query, offset, PAGE_SIZE)
+        ms = (time.perf_counter() - start) / repeats * 1000
+        print(f"{label:>16}: {total:>7} matches, page of {len(rows)} in {ms:.2f} ms")
+
+
+def _child_export(extension, rows, draws):
+    """Runs inside the child process: export rows winners in draws draws"""
+    from datetime import datetime
+    from exporters import export_results
+
+    entries = make_entries(rows)
+    per_draw = -(-rows // draws)
+    batches = [
+        (datetime.now(), (f"bench/{n + 1}", "00" * 32, "11" * 32), entries[start:start + per_draw])
+        for n, start in enumerate(range(0, rows, per_draw))
+    ]
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    path = os.path.join(BENCH_DIR, f"export_{rows}{extension}")
+    start = time.perf_counter()
+    try:
+        written = export_results(path, batches)
+    except ImportError:
+        print("skipped")
+        return
+    elapsed = time.perf_counter() - start
+    peak_mb = peak_rss_mb()
+    print(f"{written} {elapsed:.3f} {peak_mb:.1f} {os.path.getsize(path) / 2**20:.1f}")
+
+
+def bench_export(rows=200_000, draws=20):
+    """Export throughput and peak memory of the save-as formats"""
+    print(f"{'format':>9} {'seconds':>9} {'rows/s':>10} {'peak MB':>9} {'file MB':>9}")
+    for extension in (".csv", ".xlsx", ".parquet"):
+        result = run_child("export", extension, str(rows), str(draws))
+        if result == ["skipped"]:
+            print(f"{extension:>9} skipped, library not installed")
+            continue
+        written, seconds, peak_mb, file_mb = int(result[0]), *map(float, result[1:])
+        assert written == rows
+        print(f"{extension:>9} {seconds:>9.2f} {rows / seconds:>10.0f} {peak_mb:>9.0f} {file_mb:>9.1f}")
+
+
+FIRST_NAMES = ("علی", "محمد", "حسین", "رضا", "مهدی", "امیر", "حسن", "سعید", "مجید", "احمد",
+               "زهرا", "فاطمه", "مریم", "سارا", "نرگس", "مینا", "لیلا", "نازنین", "الهام", "سمیه")
+LAST_NAMES = ("احمدی", "محمدی", "حسینی", "رضایی", "کریمی", "موسوی", "جعفری", "هاشمی", "صادقی",
+              "رحیمی", "قاسمی", "نوری", "کاظمی", "طاهری", "عباسی", "مرادی", "یوسفی", "اکبری")
+PERSIAN_DIGITS = str.maketrans("0123456789", "۰۱۲۳۴۵۶۷۸۹")
+SUITE_SIZES = [10_000, 1_000_000, 5_000_000]
+SUITE_WINNERS = 1_000
+SUITE_DRAWS = 5
+SUITE_EXPORT_ROWS = 200_000
+HISTORY_PATH = os.path.join(BENCH_DIR, "history.json")
+
+
+def national_id_check_digit(digits):
+    """Check digit of an Iranian national ID from its first nine digits"""
+    remainder = sum(int(d) * (10 - i) for i, d in enumerate(digits)) % 11
+    return remainder if remainder < 2 else 11 - remainder
+
+
+def make_participant_rows(count, seed=0, duplicate_rate=0.02, malformed_rate=0.01):
+    """Yield count synthetic participant rows the way real files look
+
+    Deterministic for a seed. National IDs carry a valid check digit and
+    phones are 09xxxxxxxxx, sometimes written +989..., without the leading
+    zero or in Persian digits. About duplicate_rate of the rows repeat an
+    earlier national ID and malformed_rate miss a field or the whole phone.
+    """
+    rng = random.Random(seed)
+    recent = []
+    for _ in range(count):
+        draw = rng.random()
+        if draw < malformed_rate:
+            kind = rng.randrange(4)
+            name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+            if kind == 0:
+                yield ["", f"{rng.randrange(10**10):010d}", f"09{rng.randrange(10**9):09d}"]
+            elif kind == 1:
+                yield [name, "", f"09{rng.randrange(10**9):09d}"]
+            elif kind == 2:
+                yield [name, f"{rng.randrange(10**10):010d}", ""]
+            else:
+                yield [name, f"{rng.randrange(10**10):010d}"]
+            continue
+        if draw < malformed_rate + duplicate_rate and recent:
+            national_id = rng.choice(recent)
+        else:
+            digits = f"{rng.randrange(10**9):09d}"
+            national_id = f"{digits}{national_id_check_digit(digits)}"
+            if len(recent) < 1000:
+                recent.append(national_id)
+            else:
+                recent[rng.randrange(1000)] = national_id
+        phone = f"9{rng.randrange(10**9):09d}"
+        style = rng.randrange(10)
+        if style == 0:
+            phone = "+98" + phone
+        elif style == 1:
+            phone = ("0" + phone).translate(PERSIAN_DIGITS)
+        elif style > 2:
+            phone = "0" + phone
+        yield [f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", national_id, phone]
+
+
+def suite_file(rows):
+    """Path of the cached synthetic CSV for the suite"""
+    import csv
+
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    path = os.path.join(BENCH_DIR, f"suite_{rows}.csv")
+    if not os.path.exists(path):
+        print(f"Generating {path} ...")
+        partial = path + ".partial"
+        with open(partial, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["نام", "کد ملی", "شماره موبایل"])
+            writer.writerows(make_participant_rows(rows))
+        os.replace(partial, path)
+    return path
+
+
+def _child_suite(rows):
+    """Runs inside the child process: time every stage on one suite file"""
+    import json
+    import shutil
+    import tempfile
+    from datetime import datetime
+
+    from audit import HmacDrbg
+    from draw_engine import DrawEngine
+    from exporters import export_results
+    from loader import load_participants
+    from metrics import METRICS
+    from phones import normalize_phones
+    from pool import ParticipantPool
+    from registry import WinnerRegistry
+
+    path = suite_file(rows)
+    work_dir = tempfile.mkdtemp(dir=BENCH_DIR)
+    try:
+        with METRICS.span("ingest"):
+            store, stats = load_participants(path, cache_dir=work_dir)
+        with METRICS.span("ingest_snapshot"):
+            load_participants(path, cache_dir=work_dir)
+
+        # Every 20th participant has won before
+        registry = WinnerRegistry(os.path.join(work_dir, "winners.db"))
+        registry.add_rows((store.name(i), store.national_id(i), "", "2025-01-01 12:00:00")
+                          for i in range(0, len(store), 20))
+        with METRICS.span("eligibility"):
+            pool = ParticipantPool(store)
+            pool.remove_indices(registry.winner_indices(store))
+
+        engine = DrawEngine(pool, HmacDrbg(b"bench"))
+        with METRICS.span("sampling"):
+            for _ in range(SUITE_DRAWS):
+                engine.draw_indices(min(SUITE_WINNERS, len(pool)))
+
+        phones = [store.phone(i) for i in range(len(store))]
+        with METRICS.span("masking"):
+            normalize_phones(phones)
+        del phones
+
+        winners = [store[i] for i in range(min(SUITE_EXPORT_ROWS, len(store)))]
+        with METRICS.span("export"):
+            export_results(os.path.join(work_dir, "winners.csv"),
+                           [(datetime.now(), ("bench/1", "00" * 32, "11" * 32), winners)])
+    finally:
+        shutil.rmtree(work_dir)
+
+    result = {name: round(span["total_seconds"], 4) for name, span in METRICS.snapshot()["spans"].items()}
+    result["entries"] = len(store)
+    result["duplicate_rows"] = stats.duplicates.duplicate_rows
+    result["peak_mb"] = round(peak_rss_mb(), 1)
+    print(json.dumps(result, separators=(",", ":")))
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            check=True, capture_output=True, text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_suite(sizes):
+    """Time ingest, eligibility, sampling, masking and export, and append to the history
+
+    Runs on the headless engine, so no display (or Xvfb) is needed. Each
+    size runs in a fresh child process; the results are appended to
+    bench_data/history.json and compared with the previous run of the same size.
+    """
+    import json
+    import platform
+    from datetime import datetime
+
+    history = []
+    if os.path.exists(HISTORY_PATH):
+        with open(HISTORY_PATH, encoding="utf-8") as f:
+            history = json.load(f)
+    run = {
+        "at": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "results": {},
+    }
+    stages = ("ingest", "ingest_snapshot", "eligibility", "sampling", "masking", "export")
+    print(f"{'rows':>10} " + " ".join(f"{stage:>15}" for stage in stages) + f" {'peak MB':>8}")
+    for rows in sizes:
+        suite_file(rows)
+        result = json.loads(run_child("suite", str(rows))[0])
+        run["results"][str(rows)] = result
+        previous = next((old["results"][str(rows)] for old in reversed(history)
+                         if str(rows) in old["results"]), None)
+        cells = []
+        for stage in stages:
+            cell = f"{result[stage]:.3f}s"
+            if previous and previous.get(stage):
+                cell += f" {(result[stage] / previous[stage] - 1) * 100:+.0f}%"
+            cells.append(f"{cell:>15}")
+        print(f"{rows:>10} " + " ".join(cells) + f" {result['peak_mb']:>8.0f}")
+
+    history.append(run)
+    with open(HISTORY_PATH, "w", encoding="utf-8") as f:
+        json.dump(history, f, ensure_ascii=False, indent=1)
+    print(f"Recorded in {HISTORY_PATH} (commit {run['commit']}), % is the change from the previous run")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args[:1] == ["_child"]:
+        if args[1] == "load":
+            _child_load(args[2], args[3])
+        elif args[1] == "dedup":
+            _child_dedup(int(args[2]))
+        elif args[1] == "suite":
+            _child_suite(int(args[2]))
+        elif args[1] == "export":
+            _child_export(args[2], int(args[3]), int(args[4]))
+    elif args[:1] == ["load"]:
+        bench_load([int(n) for n in args[1:]] or DEFAULT_LOAD_SIZES)
+    elif args[:1] == ["draw"]:
+        bench_draw(*[int(n) for n in args[1:]])
+    elif args[:1] == ["mask"]:
+        bench_mask(*[int(n) for n in args[1:]])
+    elif args[:1] == ["memory"]:
+        bench_memory(*[int(n) for n in args[1:]])
+    elif args[:1] == ["formats"]:
+        bench_formats(*[int(n) for n in args[1:]])
+    elif args[:1] == ["sheets"]:
+        bench_sheets(*[int(n) for n in args[1:]])
+    elif args[:1] == ["dedup"]:
+        bench_dedup(*[int(n) for n in args[1:]])
+    elif args[:1] == ["weighted"]:
+        bench_weighted(*[int(n) for n in args[1:]])
+    elif args[:1] == ["replay"]:
+        bench_replay(*[int(n) for n in args[1:]])
+    elif args[:1] == ["startup"]:
+        bench_startup(*[int(n) for n in args[1:]])
+    elif args[:1] == ["registry"]:
+        bench_registry(*[int(n) for n in args[1:]])
+    elif args[:1] == ["suite"]:
+        bench_suite([int(n) for n in args[1:]] or SUITE_SIZES)
+    elif args[:1] == ["export"]:
+        bench_export(*[int(n) for n in args[1:]])
+    elif args[:1] == ["winners-search"]:
+        bench_winners_search(*[int(n) for n in args[1:]])
+    elif args[:1] == ["weighted-check"]:
+        bench_weighted_check(*[int(n) for n in args[1:]])
+    else:
+        print(__doc__)
@@ -0,0 +1,177 @@
+"""Headless command-line draws, for servers without a display
+
+    python cli.py participants.xlsx --winners 10 --draws 3 --seed 1404 -o winners.csv
+
+Winners are written in the winners journal format (masked phones) as each
+draw finishes: to stdout by default, or to a .csv or .xlsx file. Draws use
+the audited generator from audit.py; the seed commitment is logged before
+drawing and the seed after. With --record the draws also go to winners.csv,
+winners.db and audit.jsonl like draws made in the app, and past winners are
+excluded. --metrics writes the timings and counters of the run (see
+metrics.py). Nothing here imports tkinter.
+"""
+import argparse
+import contextlib
+import csv
+import os
+import sys
+from datetime import datetime
+
+from audit import AuditLog, commitment, draw_rng, new_seed
+from dedup import DEFAULT_POLICY, POLICIES
+from draw_engine import DrawEngine, DrawError
+from loader import load_participants
+from metrics import METRICS
+from pool import ParticipantPool
+from results import HEADER, TIMESTAMP_FORMAT, write_xlsx
+from snapshot import DEFAULT_CACHE_DIR
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run lottery draws without the GUI")
+    parser.add_argument("file", help="participant file (xlsx, csv, tsv, parquet, xls)")
+    parser.add_argument("-n", "--winners", type=int, default=1, help="winners per draw")
+    parser.add_argument("--draws", type=int, default=1, help="number of draws, winners never repeat")
+    parser.add_argument("--seed", help="seed for a reproducible draw (default: a fresh random seed)")
+    parser.add_argument("-o", "--output", help=".csv or .xlsx file for the results (default: stdout)")
+    parser.add_argument("--dedup", choices=POLICIES + ("none",), default=DEFAULT_POLICY,
+                        help="what to do with rows sharing a national ID")
+    parser.add_argument("--weights", action="store_true",
+                        help="read the fourth column as ticket counts (default: only when its header says so)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes for parsing workbooks with several sheets (default: 1)")
+    parser.add_argument("--record", action="store_true",
+                        help="exclude past winners and record these draws in winners.csv and winners.db")
+    parser.add_argument("--no-cache", action="store_true", help="do not read or write participant snapshots")
+    parser.add_argument("--metrics", help="write timings and counters to this .json or .prom file")
+    return parser.parse_args(argv)
+
+
+def log(message):
+    # stdout may carry the results, so progress goes to stderr
+    print(message, file=sys.stderr, flush=True)
+
+
+def iter_draws(engine, winners, draws, seed, file_sha256, draw_ids):
+    """Yield (draw ID, indices, winners) as each draw is made"""
+    for _ in range(draws):
+        draw_id = next(draw_ids)
+        with METRICS.span("draw.select"):
+            engine.rng = draw_rng(seed, file_sha256, draw_id)
+            indices = engine.draw_indices(winners)
+        METRICS.count("draws")
+        METRICS.count("winners_drawn", len(indices))
+        yield draw_id, indices, [engine.pool.entries[i] for i in indices]
+
+
+def result_rows(drawn, timestamp, audit):
+    """Journal rows of one draw, numbered like ResultsJournal.append"""
+    return (
+        [i, name, national_id, masked_phone, timestamp, *audit]
+        for i, (name, national_id, _, masked_phone) in enumerate(drawn, start=1)
+    )
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.winners <= 0 or args.draws <= 0:
+        log("--winners and --draws must be positive")
+        return 2
+
+    def progress(stats):
+        percent = f" ({stats.percent:.0f}%)" if stats.percent is not None else ""
+        log(f"read {stats.rows} rows{percent}")
+
+    dedup = None if args.dedup == "none" else args.dedup
+    # The loader logs with print, keep that out of the results on stdout
+    with contextlib.redirect_stdout(sys.stderr), METRICS.span("load.parse"):
+        entries, stats = load_participants(
+            args.file,
+            progress=progress,
+            cache_dir=None if args.no_cache else DEFAULT_CACHE_DIR,
+            dedup=dedup,
+            weights=True if args.weights else None,
+            workers=args.workers,
+        )
+    log(f"loaded {len(entries)} participants in {stats.elapsed:.2f}s")
+    if stats.invalid_weights:
+        examples = ", ".join(f"row {row}: {value!r}" for row, value in stats.invalid_weight_examples)
+        log(f"left out {stats.invalid_weights} rows with an invalid ticket count ({examples})")
+    METRICS.count("rows_loaded", stats.rows)
+    METRICS.count("entries_loaded", len(entries))
+    if stats.duplicates is not None and stats.duplicates.duplicate_rows:
+        log(f"dropped {stats.duplicates.duplicate_rows} duplicate rows ({args.dedup})")
+
+    pool = ParticipantPool(entries)
+    journal = registry = audit_log = load_id = None
+    draw_ids = (f"cli/{number}" for number in range(1, args.draws + 1))
+    if args.record:
+        from registry import WinnerRegistry
+        from results import ResultsJournal
+
+        journal = ResultsJournal()
+        registry = WinnerRegistry(journal=journal)
+        with METRICS.span("load.past_winners"):
+            excluded = registry.winner_indices(entries)
+        METRICS.count("past_winners_excluded", len(excluded))
+        pool.remove_indices(excluded)
+        log(f"excluded {len(excluded)} past winners")
+        audit_log = AuditLog()
+        load_id = audit_log.record_load(args.file, stats.sha256, dedup, len(entries), excluded,
+                                          True if args.weights else None)
+        draw_ids = (audit_log.next_draw_id(load_id) for _ in range(args.draws))
+
+    total = args.winners * args.draws
+    if total > len(pool):
+        log(f"cannot draw {total} winners from {len(pool)} participants")
+        return 2
+    seed = args.seed.encode("utf-8") if args.seed is not None else new_seed()
+    log(f"seed commitment: {commitment(seed)}")
+    draws = iter_draws(DrawEngine(pool), args.winners, args.draws, seed, stats.sha256, draw_ids)
+
+    def record(draw_id, indices, drawn, drawn_at):
+        if journal is None:
+            return
+        with METRICS.span("draw.save"):
+            audit_log.record_draw(load_id, draw_id, seed, indices, [winner[1] for winner in drawn], drawn_at)
+            journal.append(drawn, drawn_at, audit=(draw_id, seed.hex(), stats.sha256))
+            registry.add(drawn, drawn_at)
+
+    try:
+        if args.output and os.path.splitext(args.output)[1].lower() == ".xlsx":
+            def rows():
+                for draw_id, indices, drawn in draws:
+                    drawn_at = datetime.now()
+                    record(draw_id, indices, drawn, drawn_at)
+                    log(f"draw {draw_id}: {len(drawn)} winners")
+                    yield from result_rows(drawn, drawn_at.strftime(TIMESTAMP_FORMAT),
+                                           (draw_id, seed.hex(), stats.sha256))
+
+            # write_xlsx streams rows in write-only mode, the file is complete on save
+            write_xlsx(args.output, rows())
+        else:
+            out = open(args.output, "w", newline="", encoding="utf-8-sig") if args.output else sys.stdout
+            try:
+                writer = csv.writer(out)
+                writer.writerow(HEADER)
+                for draw_id, indices, drawn in draws:
+                    drawn_at = datetime.now()
+                    record(draw_id, indices, drawn, drawn_at)
+                    writer.writerows(result_rows(drawn, drawn_at.strftime(TIMESTAMP_FORMAT),
+                                                 (draw_id, seed.hex(), stats.sha256)))
+                    out.flush()
+                    log(f"draw {draw_id}: {len(drawn)} winners")
+            finally:
+                if out is not sys.stdout:
+                    out.close()
+    except DrawError as e:
+        log(str(e))
+        return 2
+    log(f"seed: {seed.hex()}")
+    if args.metrics:
+        METRICS.write(args.metrics)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,276 @@
+"""Duplicate participant detection while a file is loaded"""
+import csv
+import heapq
+from array import array
+from itertools import compress, repeat
+
+from store import MAX_WEIGHT
+
+POLICIES = ("first", "last", "weighted")
+# Files that repeat a person's row to give them more tickets keep their odds
+DEFAULT_POLICY = "weighted"
+POLICY_LABELS = {
+    "first": "اولین ردیف هر کد ملی",
+    "last": "آخرین ردیف هر کد ملی",
+    "weighted": "یک ردیف با شانس برابر تعداد تکرار",
+}
+# National IDs up to 17 digits are packed into the table with their length,
+# so "0123..." and "123..." stay apart; anything else uses a dict
+MAX_TABLE_DIGITS = 17
+HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+MASK64 = (1 << 64) - 1
+TOP_DUPLICATES = 100
+
+
+class IdTable:
+    """Open-addressing hash table from packed national IDs to row indices
+
+    Keys and values live in two flat arrays (12 bytes per slot) instead of a
+    dict of Python ints, which keeps the memory for millions of IDs bounded.
+    Keys are stored as number + 1 so 0 can mark an empty slot.
+    """
+
+    def __init__(self, bits=16):
+        self.size = 0
+        self._allocate(bits)
+
+    def _allocate(self, bits):
+        self.bits = bits
+        self.shift = 64 - bits
+        self.mask = (1 << bits) - 1
+        # Grown once more than half of the slots are taken
+        self.limit = 1 << (bits - 1)
+        self.keys = array('Q', bytes(8 << bits))
+        self.values = array('i', bytes(4 << bits))
+
+    def _resize(self, bits):
+        # Only the taken slots are visited, and the new slots of all of them
+        # are found in one loop instead of an _insert call per key
+        taken = compress(zip(self.keys, self.values), self.keys)
+        self._allocate(bits)
+        keys, values, shift, mask = self.keys, self.values, self.shift, self.mask
+        for key, value in taken:
+            slot = ((key * HASH_MULTIPLIER) & MASK64) >> shift
+            while keys[slot]:
+                slot = (slot + 1) & mask
+            keys[slot] = key
+            values[slot] = value
+
+    def reserve(self, count):
+        """Grow so count keys fit without resizing while they are added"""
+        bits = self.bits
+        while count > 1 << (bits - 1):
+            bits += 1
+        if bits != self.bits:
+            self._resize(bits)
+
+    def _slot(self, key):
+        slot = ((key * HASH_MULTIPLIER) & MASK64) >> self.shift
+        keys = self.keys
+        while keys[slot] and keys[slot] != key:
+            slot = (slot + 1) & self.mask
+        return slot
+
+    def _insert(self, key, value):
+        slot = self._slot(key)
+        if not self.keys[slot]:
+            self.keys[slot] = key
+            self.size += 1
+            if self.size > self.limit:
+                self.values[slot] = value
+                self._resize(self.bits + 1)
+                return
+        self.values[slot] = value
+
+    def setdefault(self, number, value):
+        """Return the value stored for number, storing value first if there is none"""
+        key = number + 1
+        keys = self.keys
+        # _slot inlined, this is the hot path of deduplication
+        slot = ((key * HASH_MULTIPLIER) & MASK64) >> self.shift
+        found = keys[slot]
+        while found:
+            if found == key:
+                return self.values[slot]
+            slot = (slot + 1) & self.mask
+            found = keys[slot]
+        keys[slot] = key
+        self.values[slot] = value
+        self.size += 1
+        if self.size > self.limit:
+            self._resize(self.bits + 1)
+        return value
+
+    def __setitem__(self, number, value):
+        self._insert(number + 1, value)
+
+
+class DuplicateReport:
+    """What the deduplication stage found in one file"""
+
+    def __init__(self, policy, rows=0, unique=0, duplicated_ids=0, top=()):
+        self.policy = policy
+        self.rows = rows
+        self.unique = unique
+        self.duplicated_ids = duplicated_ids
+        # (national ID, row count) of the most duplicated people
+        self.top = list(top)
+        self._store = None
+        self._counts = None
+
+    @property
+    def duplicate_rows(self):
+        return self.rows - self.unique
+
+    @property
+    def counts(self):
+        """Rows of each kept person, None when the report was read back without them"""
+        return self._counts
+
+    @property
+    def complete(self):
+        """True when every duplicated person can be listed, not just the top ones"""
+        return self._counts is not None
+
+    def finish(self, store, counts, top_n=TOP_DUPLICATES):
+        """Fill in the per-person part from the deduplicated store and its row counts"""
+        self._store = store
+        self._counts = counts
+        self.duplicated_ids = sum(1 for count in counts if count > 1)
+        top = heapq.nlargest(top_n, ((count, i) for i, count in enumerate(counts) if count > 1))
+        self.top = [(store.national_id(i), count) for count, i in top]
+
+    def attach(self, store, counts):
+        """Give a report read back with from_dict its store and row counts, for the full list"""
+        self._store = store
+        self._counts = counts
+
+    def iter_duplicates(self):
+        """(national ID, row count) for every duplicated person, or just the top list"""
+        if self._counts is None:
+            yield from self.top
+            return
+        for i, count in enumerate(self._counts):
+            if count > 1:
+                yield self._store.national_id(i), count
+
+    def write_csv(self, path):
+        with open(path, "w", newline="", encoding="utf-8-sig") as f:
+            writer = csv.writer(f)
+            writer.writerow(["کد ملی", "تعداد تکرار"])
+            writer.writerows(self.iter_duplicates())
+
+    def to_dict(self):
+        return {
+            "policy": self.policy,
+            "rows": self.rows,
+            "unique": self.unique,
+            "duplicated_ids": self.duplicated_ids,
+            "top": self.top,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["policy"], data["rows"], data["unique"], data["duplicated_ids"],
+                   [tuple(item) for item in data["top"]])
+
+    def __repr__(self):
+        return (f"DuplicateReport(policy={self.policy}, rows={self.rows}, unique={self.unique}, "
+                f"duplicate_rows={self.duplicate_rows}, duplicated_ids={self.duplicated_ids})")
+
+
+class Deduplicator:
+    """Streaming per-person deduplication keyed by normalized national ID
+
+    add() is fed the national IDs of consecutive rows and apply() then drops
+    the duplicate rows from the store holding them:
+      first     keep the first row of each person
+      last      keep the last row of each person
+      weighted  keep the first row, with the person's total tickets as store weight
+    Memory stays at the hash table plus 5 bytes per row (9 when weighted).
+    """
+
+    def __init__(self, policy=DEFAULT_POLICY):
+        if policy not in POLICIES:
+            raise ValueError(f"unknown duplicate policy {policy!r}, expected one of {POLICIES}")
+        self.policy = policy
+        self.table = IdTable()
+        self.other_ids = {}
+        self.keep = bytearray()
+        # Rows seen for each person, stored on the row that is currently kept
+        self.counts = array('I')
+        # Tickets of each person (the sum of their rows' weights), weighted policy only
+        self.tickets = array('I') if policy == "weighted" else None
+        self.report = DuplicateReport(policy)
+
+    @staticmethod
+    def table_key(national_id):
+        if national_id.isascii() and national_id.isdigit() and len(national_id) <= MAX_TABLE_DIGITS:
+            return int(national_id) << 5 | len(national_id)
+        return None
+
+    def holder(self, national_id, row):
+        """Row currently kept for national_id, registering row if the ID is new"""
+        if len(national_id) <= MAX_TABLE_DIGITS and national_id.isascii() and national_id.isdigit():
+            return self.table.setdefault(int(national_id) << 5 | len(national_id), row)
+        return self.other_ids.setdefault(national_id, row)
+
+    def reserve(self, rows):
+        """Size the table for a file of about rows rows up front, instead of resizing while they are added
+
+        Every row is counted as a new person, so a file full of duplicates
+        may get a table one size larger than it needs.
+        """
+        self.table.reserve(rows)
+
+    def set_holder(self, national_id, row):
+        key = self.table_key(national_id)
+        if key is None:
+            self.other_ids[national_id] = row
+        else:
+            self.table[key] = row
+
+    def add(self, national_ids, weights=None):
+        """Register consecutive rows by national ID, weights gives their ticket counts"""
+        keep = self.keep
+        counts = self.counts
+        tickets = self.tickets
+        last_wins = self.policy == "last"
+        for national_id, weight in zip(national_ids, repeat(1) if weights is None else weights):
+            row = len(keep)
+            first = self.holder(national_id, row)
+            if first == row:
+                keep.append(1)
+                counts.append(1)
+                if tickets is not None:
+                    tickets.append(weight)
+            elif last_wins:
+                keep[first] = 0
+                keep.append(1)
+                counts.append(counts[first] + 1)
+                counts[first] = 0
+                self.set_holder(national_id, row)
+            else:
+                keep.append(0)
+                counts.append(0)
+                counts[first] += 1
+                if tickets is not None:
+                    tickets.append(0)
+                    # Rows are within MAX_WEIGHT each, their sum may not be
+                    tickets[first] = min(tickets[first] + weight, MAX_WEIGHT)
+
+    def apply(self, store):
+        """Return store without the duplicate rows and finish the report"""
+        self.report.rows = len(self.keep)
+        self.report.unique = self.table.size + len(self.other_ids)
+        counts = self.counts
+        tickets = self.tickets
+        if self.report.duplicate_rows:
+            store = store.compress(self.keep)
+            counts = array('I', compress(counts, self.keep))
+            if tickets is not None:
+                tickets = array('I', compress(tickets, self.keep))
+        if tickets is not None:
+            store.weights = tickets
+        self.report.finish(store, counts)
+        return store
@@ -0,0 +1,54 @@
+"""GUI-free draw engine, usable from LotteryApp or from scripts"""
+import random
+
+from pool import ParticipantPool
+
+
+class DrawError(Exception):
+    """Raised when a draw cannot be made, e.g. not enough eligible participants"""
+
+
+class DrawEngine:
+    """Draws winners from a ParticipantPool and removes them from it
+
+    Each round excludes the winners of every earlier round, so drawing
+    [("grand", 1), ("second", 10)] in one call gives the same winners as two
+    separate draw() calls made with the same random generator. rng can be
+    any random.Random, e.g. audit.HmacDrbg for draws that can be replayed.
+    """
+
+    def __init__(self, pool=None, rng=None):
+        self.pool = pool if pool is not None else ParticipantPool()
+        self.rng = rng if rng is not None else random.Random()
+
+    @property
+    def remaining(self):
+        return len(self.pool)
+
+    def draw_indices(self, count):
+        """Draw count winners, returns their indices into the pool's entries"""
+        if count <= 0:
+            raise DrawError(f"winner count must be positive, got {count}")
+        if count > len(self.pool):
+            raise DrawError(f"cannot draw {count} winners from {len(self.pool)} participants")
+        indices = self.pool.sample_indices(count, self.rng)
+        for i in indices:
+            self.pool.remove_index(i)
+        return indices
+
+    def draw(self, count):
+        """Draw count winners, returns the list of winning entries"""
+        return [self.pool.entries[i] for i in self.draw_indices(count)]
+
+    def draw_rounds(self, rounds):
+        """Draw several prize tiers in order
+
+        rounds is a sequence of (name, count) pairs, returns a list of
+        (name, winners) pairs. The total is checked up front so a failing call
+        leaves the pool untouched.
+        """
+        rounds = list(rounds)
+        total = sum(count for _, count in rounds)
+        if total > len(self.pool):
+            raise DrawError(f"cannot draw {total} winners from {len(self.pool)} participants")
+        return [(name, self.draw(count)) for name, count in rounds]
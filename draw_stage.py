@@ -0,0 +1,159 @@
+"""Fullscreen draw stage, created once per session and reused for every draw"""
+import tkinter as tk
+
+from animation import AnimationScheduler
+from winners_view import WinnersView
+
+
+class DrawStage:
+    """The fullscreen window draws run in
+
+    Every widget (background, countdown, spinner, winner cards and control
+    buttons) is created once. Closing the stage only hides it and a new draw
+    resets the widgets in place, so back-to-back draws start without
+    building a window, decoding the background or measuring fonts again.
+    """
+
+    def __init__(self, parent, on_retry, on_hide):
+        self.on_hide = on_hide
+        self.visible = False
+        self.window = tk.Toplevel(parent)
+        # Kept hidden until the first draw so it does not flash on screen
+        self.window.withdraw()
+        self.window.configure(bg='black')
+        self.window.title("قرعه‌کشی در حال انجام...")
+        self.window.attributes('-fullscreen', True)
+        self.window.protocol("WM_DELETE_WINDOW", self.hide)
+        self.window.bind("<Escape>", lambda e: self.hide())
+        self.scheduler = AnimationScheduler(self.window)
+        self.background = None
+        self.winners_view = None
+
+        self.bg_label = tk.Label(self.window, bg='black', bd=0)
+        self.countdown_label = tk.Label(
+            self.window,
+            font=("B Titr", 100),
+            fg="white",
+            bg="black",
+            relief=tk.RAISED,
+            bd=5
+        )
+        self.spin_label = tk.Label(
+            self.window,
+            font=("B Titr", 40),
+            fg="yellow",
+            bg="black",
+            justify="center",
+            relief=tk.RAISED,
+            bd=5,
+            anchor='center'
+        )
+        self.audit_label = tk.Label(
+            self.window,
+            font=("Courier", 11),
+            fg="white",
+            bg="black"
+        )
+        self.audit_label.place(relx=0.5, rely=0.03, anchor="n")
+
+        # Control buttons
+        self.control_frame = tk.Frame(self.window, bg='black')
+        retry_btn = tk.Button(
+            self.control_frame,
+            text="🔁 قرعه‌کشی مجدد",
+            font=("B Titr", 20),
+            command=on_retry,
+            bg="#007bff",
+            fg="white",
+            padx=20,
+            pady=10,
+            bd=0,
+            relief=tk.RAISED
+        )
+        retry_btn.pack(side=tk.LEFT, padx=10)
+        close_btn = tk.Button(
+            self.control_frame,
+            text="✕ بستن",
+            font=("B Titr", 20),
+            command=self.hide,
+            bg="#dc3545",
+            fg="white",
+            padx=20,
+            pady=10,
+            bd=0,
+            relief=tk.RAISED
+        )
+        close_btn.pack(side=tk.RIGHT, padx=10)
+
+    def exists(self):
+        return bool(self.window.winfo_exists())
+
+    def set_background(self, photo, screen_size):
+        """Show photo centered behind everything, or no background for None"""
+        if photo is self.background:
+            return
+        self.background = photo
+        if photo is None:
+            self.bg_label.place_forget()
+            return
+        screen_width, screen_height = screen_size
+        self.bg_label.config(image=photo)
+        self.bg_label.place(
+            x=(screen_width - photo.width()) // 2,
+            y=(screen_height - photo.height()) // 2
+        )
+        self.bg_label.lower()
+
+    def reset(self, audit_text):
+        """Clear the previous draw and bring the stage up for a new countdown"""
+        self.scheduler.cancel_all()
+        self.spin_label.place_forget()
+        self.control_frame.place_forget()
+        if self.winners_view is not None:
+            self.winners_view.place_forget()
+        self.audit_label.config(text=audit_text)
+        self.countdown_label.config(text="")
+        self.countdown_label.place(relx=0.5, rely=0.5, anchor="center")
+        if not self.visible:
+            self.visible = True
+            self.window.deiconify()
+        self.window.lift()
+        self.window.focus_set()
+
+    def show_countdown(self, seconds):
+        self.countdown_label.config(text=str(seconds))
+
+    def start_spinner(self):
+        self.countdown_label.place_forget()
+        self.spin_label.config(text="")
+        self.spin_label.place(relx=0.5, rely=0.5, anchor="center")
+        self.control_frame.place(relx=0.5, rely=0.9, anchor="center")
+
+    def show_name(self, text):
+        self.spin_label.config(text=text)
+
+    def add_audit_line(self, text):
+        self.audit_label.config(text=f"{self.audit_label.cget('text')}\n{text}")
+
+    def show_winners(self, winners, winner_bg, winner_fg, highlight_color):
+        self.spin_label.place_forget()
+        # Only the visible winner cards are drawn, however many winners there are
+        if self.winners_view is None:
+            self.winners_view = WinnersView(self.window, winners, winner_bg, winner_fg, highlight_color)
+        else:
+            # Theme colors may have changed since the last draw
+            self.winners_view.winner_bg = winner_bg
+            self.winners_view.winner_fg = winner_fg
+            self.winners_view.highlight_color = highlight_color
+            self.winners_view.set_winners(winners)
+        self.winners_view.place(relx=0.5, rely=0.5, anchor="center", relwidth=0.9, relheight=0.7)
+        self.control_frame.lift()
+
+    def hide(self):
+        """Stop any animation and hide the stage, its widgets stay for the next draw"""
+        if not self.visible:
+            return
+        self.visible = False
+        self.scheduler.cancel_all()
+        self.window.withdraw()
+        self.on_hide()
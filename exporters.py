@@ -0,0 +1,117 @@
+"""Winner exports, picked by file extension
+
+An export is a list of draws, each (drawn_at, audit, winners) as recorded
+by the app: the draw time and audit columns are the same for every winner
+of a draw, so they are formatted once per draw. Rows are produced in chunks
+and a writer is a function taking (path, chunks) that writes each chunk as
+it arrives, so memory does not grow with the size of the export. Writers
+for optional formats import their library lazily.
+"""
+import csv
+import os
+
+from results import HEADER, TIMESTAMP_FORMAT, write_xlsx
+
+WRITERS = {}
+CHUNK_ROWS = 10_000
+
+
+class ExportCancelled(Exception):
+    """Raised when an export is cancelled before it finishes"""
+
+
+def register_writer(*extensions):
+    """Register the decorated writer for the given lowercase extensions"""
+    def decorator(writer):
+        for extension in extensions:
+            WRITERS[extension] = writer
+        return writer
+    return decorator
+
+
+def export_filetypes():
+    """File dialog types of the supported export formats, Excel first"""
+    return [("Excel files", "*.xlsx"), ("CSV files", "*.csv"), ("Parquet files", "*.parquet")]
+
+
+def iter_chunks(draws, chunk_rows=CHUNK_ROWS):
+    """Yield lists of result rows, numbered across all draws"""
+    chunk = []
+    number = 0
+    for drawn_at, audit, winners in draws:
+        tail = [drawn_at.strftime(TIMESTAMP_FORMAT), *audit]
+        for name, national_id, _, masked_phone in winners:
+            number += 1
+            chunk.append([number, name, national_id, masked_phone, *tail])
+            if len(chunk) == chunk_rows:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+@register_writer(".xlsx")
+def write_xlsx_chunks(path, chunks):
+    """Excel through a write-only workbook, rows go to a temporary file as they come"""
+    write_xlsx(path, (row for chunk in chunks for row in chunk))
+
+
+@register_writer(".csv")
+def write_csv_chunks(path, chunks):
+    # utf-8-sig so Excel shows the Persian text correctly
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        for chunk in chunks:
+            writer.writerows(chunk)
+
+
+@register_writer(".parquet", ".pq")
+def write_parquet_chunks(path, chunks):
+    """One Parquet row group per chunk, needs the pyarrow package"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("ذخیره فایل‌های Parquet به بسته pyarrow نیاز دارد (pip install pyarrow)")
+
+    schema = pa.schema([(HEADER[0], pa.int64())] + [(column, pa.string()) for column in HEADER[1:]])
+    with pq.ParquetWriter(path, schema) as writer:
+        for chunk in chunks:
+            # Draws without audit data have fewer columns
+            columns = [[row[i] if i < len(row) else None for row in chunk] for i in range(len(HEADER))]
+            writer.write_table(pa.table(columns, schema=schema))
+
+
+def export_results(path, draws, progress=None, cancel_event=None):
+    """Write draws to path in the format of its extension, returns the row count
+
+    progress(rows written, total rows) is called after every chunk. The file
+    is written under a temporary name and only replaces path once complete,
+    so a failed or cancelled export leaves no partial file behind.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in WRITERS:
+        raise ValueError(f"قالب فایل {extension or path} برای ذخیره پشتیبانی نمی‌شود")
+    total = sum(len(winners) for _, _, winners in draws)
+    written = 0
+
+    def chunks():
+        nonlocal written
+        for chunk in iter_chunks(draws):
+            if cancel_event is not None and cancel_event.is_set():
+                raise ExportCancelled()
+            yield chunk
+            written += len(chunk)
+            if progress is not None:
+                progress(written, total)
+
+    base, _ = os.path.splitext(path)
+    partial = f"{base}.partial{extension}"
+    try:
+        WRITERS[extension](partial, chunks())
+        os.replace(partial, path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    return written
@@ -0,0 +1,114 @@
+"""Cache of background images resized to the screen"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+DEFAULT_DISK_DIR = os.path.join(os.path.expanduser("~"), ".lottery_cache", "backgrounds")
+
+
+def fit_size(image_size, screen_size):
+    """Largest size with the image's aspect ratio that fits on the screen"""
+    width, height = image_size
+    screen_width, screen_height = screen_size
+    img_ratio = width / height
+    screen_ratio = screen_width / screen_height
+    if img_ratio > screen_ratio:
+        # Image is wider than screen
+        return screen_width, int(screen_width / img_ratio)
+    # Image is taller than screen
+    return int(screen_height * img_ratio), screen_height
+
+
+class ImageCache:
+    """Resized background images keyed by (path, mtime, screen size)
+
+    Resized images are kept in a small in-memory LRU and, when disk_dir is set,
+    written to disk so a restart does not have to run the LANCZOS resize again.
+    The Tk PhotoImage for the most recent images is cached as well; photo()
+    must be called on the Tk thread, everything else is thread-safe.
+    """
+
+    def __init__(self, max_items=4, disk_dir=DEFAULT_DISK_DIR):
+        self.max_items = max_items
+        self.disk_dir = disk_dir
+        self._images = OrderedDict()
+        self._photos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, path, screen_size):
+        path = os.path.abspath(path)
+        return (path, os.stat(path).st_mtime_ns, tuple(screen_size))
+
+    def _remember(self, cache, key, value):
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > self.max_items:
+            cache.popitem(last=False)
+
+    def _disk_path(self, key):
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.disk_dir, f"{digest}.png")
+
+    def _load_resized(self, key):
+        # PIL is only imported once a background is actually needed
+        from PIL import Image
+
+        path, _, screen_size = key
+        disk_path = self._disk_path(key) if self.disk_dir else None
+        if disk_path and os.path.exists(disk_path):
+            try:
+                with Image.open(disk_path) as cached:
+                    cached.load()
+                    return cached.copy()
+            except Exception as e:
+                print(f"Ignoring broken image cache file {disk_path}: {e}")
+
+        with Image.open(path) as img:
+            img.load()
+            resized = img.resize(fit_size(img.size, screen_size), Image.LANCZOS)
+
+        if disk_path:
+            try:
+                os.makedirs(self.disk_dir, exist_ok=True)
+                tmp_path = f"{disk_path}.{os.getpid()}.tmp"
+                resized.save(tmp_path, format="PNG", compress_level=1)
+                os.replace(tmp_path, disk_path)
+            except Exception as e:
+                print(f"Could not write image cache: {e}")
+        return resized
+
+    def get(self, path, screen_size):
+        """Return the image at path resized to fit screen_size"""
+        key = self.key(path, screen_size)
+        with self._lock:
+            if key in self._images:
+                self._images.move_to_end(key)
+                return self._images[key]
+            image = self._load_resized(key)
+            self._remember(self._images, key, image)
+            return image
+
+    def photo(self, path, screen_size):
+        """Return a cached ImageTk.PhotoImage of the resized image (Tk thread only)"""
+        key = self.key(path, screen_size)
+        if key in self._photos:
+            self._photos.move_to_end(key)
+            return self._photos[key]
+        from PIL import ImageTk
+
+        photo = ImageTk.PhotoImage(self.get(path, screen_size))
+        self._remember(self._photos, key, photo)
+        return photo
+
+    def prewarm(self, path, screen_size):
+        """Resize path in the background so the next get() is a cache hit"""
+        def work():
+            try:
+                self.get(path, screen_size)
+            except Exception as e:
+                print(f"Could not prepare background {path}: {e}")
+
+        thread = threading.Thread(target=work, daemon=True)
+        thread.start()
+        return thread
@@ -1,26 +1,74 @@
+import time
+# Taken before any other import so startup reports include import time
+STARTUP_START = time.perf_counter()
+
 import tkinter as tk
-from tkinter import filedialog, messagebox, ttk, scrolledtext
-from openpyxl import load_workbook, Workbook
-from PIL import Image, ImageTk
-import random
+from tkinter import filedialog, messagebox, ttk
 import os
 import threading
-import time
+import queue
 import sys
 from datetime import datetime
+from readers import supported_patterns
+from pool import ParticipantPool
+from draw_engine import DrawEngine
+from results import ResultsJournal
+from exporters import ExportCancelled, export_filetypes, export_results
+from registry import WinnerRegistry
+from audit import AuditLog, commitment, draw_rng, new_seed
+from winners_browser import WinnersBrowser
+from draw_stage import DrawStage
+from spinner import SpinnerFeed
+from image_cache import ImageCache
+from dedup import DEFAULT_POLICY, POLICIES, POLICY_LABELS
+from metrics import METRICS, Profiler
+
+SPIN_FPS = 10
+HIGH_REFRESH_FPS = 60
+# Only needed once a file, image or export is picked; importing them at
+# startup would delay the first window on slow machines
+DEFERRED_MODULES = ("openpyxl", "PIL", "loader", "concurrent.futures", "multiprocessing", "cProfile")
 
 class LotteryApp:
     def __init__(self, root):
         self.root = root
         self.root.title("سامانه قرعه‌کشی هوشمند")
         self.entries = []
+        self.engine = DrawEngine()
         self.bg_path = None
         self.default_bg = self.resource_path("default_bg.jpg")
+        self.image_cache = ImageCache()
         self.countdown_seconds = 5
         self.winner_count = 1
-        self.is_spinning = False
-        self.previous_winners = []
+        # From begin_draw until the winners are taken, the countdown included
+        self.drawing = False
+        # Fullscreen draw window, created on the first draw and kept for the session
+        self.stage = None
+        self.spin_animation = None
+        self.spinner_feed = None
+        self.high_refresh = tk.BooleanVar(value=False)
+        self.dedup_policy = tk.StringVar(value=DEFAULT_POLICY)
+        # The fourth column is also read as ticket counts when its header names them
+        self.weight_column = tk.BooleanVar(value=False)
+        # Draws of this session as (drawn_at, audit, winners), for "save as"
+        self.session_draws = []
         self.current_theme = "dark"
+        self.load_thread = None
+        self.load_queue = None
+        self.load_cancel = None
+        self.export_thread = None
+        self.export_queue = None
+        self.export_cancel = None
+        self.results = ResultsJournal()
+        self.results_dirty = False
+        # Past winners of every session, excluded from each loaded file
+        self.registry = WinnerRegistry(journal=self.results)
+        # Loads and draws with their seeds, so every draw can be replayed
+        self.audit = AuditLog()
+        self.load_id = None
+        self.draw_seed = None
+        self.profiler = Profiler()
+        self.profiling = tk.BooleanVar(value=False)
         
         # Load icon
         try:
@@ -38,6 +86,21 @@ class LotteryApp:
         
         # Center the window
         self.center_window()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        # Runs once the window is on screen
+        self.root.after_idle(self.after_startup)
+
+    def after_startup(self):
+        """Report startup time, then start the work that can wait for the window"""
+        elapsed = (time.perf_counter() - STARTUP_START) * 1000
+        METRICS.record("startup", elapsed / 1000)
+        print(f"Startup: main window after {elapsed:.0f} ms, {len(sys.modules)} modules imported")
+        early = [name for name in DEFERRED_MODULES if name in sys.modules]
+        if early:
+            print(f"Startup: imported before they were needed: {', '.join(early)}")
+
+        if self.current_bg_path():
+            self.image_cache.prewarm(self.current_bg_path(), self.screen_size())
 
     def resource_path(self, relative_path):
         """ Get absolute path to resource, works for dev and for PyInstaller """
@@ -49,6 +112,17 @@ class LotteryApp:
 
         return os.path.join(base_path, relative_path)
 
+    def screen_size(self):
+        return self.root.winfo_screenwidth(), self.root.winfo_screenheight()
+
+    def current_bg_path(self):
+        """The selected background, falling back to the bundled default"""
+        if self.bg_path and os.path.exists(self.bg_path):
+            return self.bg_path
+        if os.path.exists(self.default_bg):
+            return self.default_bg
+        return None
+
     def center_window(self):
         """Center the window on screen"""
         self.root.update_idletasks()
@@ -99,21 +173,33 @@ class LotteryApp:
         file_menu.add_command(label="انتخاب تصویر پس‌زمینه", command=self.select_background)
         file_menu.add_separator()
         file_menu.add_command(label="تغییر تم", command=self.toggle_theme)
+        file_menu.add_checkbutton(label="نمایش روان (60 فریم)", variable=self.high_refresh)
+
+        dedup_menu = tk.Menu(file_menu, tearoff=0, bg=self.bg_color, fg=self.fg_color)
+        for policy in POLICIES:
+            dedup_menu.add_radiobutton(label=POLICY_LABELS[policy], variable=self.dedup_policy, value=policy)
+        file_menu.add_cascade(label="کد ملی تکراری", menu=dedup_menu)
+        file_menu.add_checkbutton(label="ستون چهارم: تعداد بلیت", variable=self.weight_column)
         file_menu.add_separator()
-        file_menu.add_command(label="خروج", command=self.root.quit)
+        file_menu.add_command(label="خروج", command=self.on_close)
         menubar.add_cascade(label="فایل", menu=file_menu)
         
         # Winners menu
         winner_menu = tk.Menu(menubar, tearoff=0, bg=self.bg_color, fg=self.fg_color)
         winner_menu.add_command(label="مشاهده برندگان قبلی", command=self.show_previous_winners)
         winner_menu.add_command(label="پاک کردن لیست برندگان", command=self.clear_winners)
-        winner_menu.add_command(label="ذخیره نتایج به صورت Excel", command=self.save_winners_explicit)
+        winner_menu.add_command(label="ذخیره نتایج (Excel، CSV یا Parquet)", command=self.save_winners_explicit)
+        winner_menu.add_command(label="به‌روزرسانی فایل winners.xlsx", command=self.export_winners_xlsx)
         menubar.add_cascade(label="برندگان", menu=winner_menu)
         
         # Help menu
         help_menu = tk.Menu(menubar, tearoff=0, bg=self.bg_color, fg=self.fg_color)
         help_menu.add_command(label="راهنمای استفاده", command=self.show_help)
         help_menu.add_command(label="درباره برنامه", command=self.show_about)
+        help_menu.add_separator()
+        help_menu.add_command(label="ذخیره آمار عملکرد...", command=self.save_metrics)
+        help_menu.add_checkbutton(label="پروفایل‌گیری (cProfile و tracemalloc)",
+                                  variable=self.profiling, command=self.toggle_profiling)
         menubar.add_cascade(label="راهنما", menu=help_menu)
         
         self.root.config(menu=menubar)
@@ -173,6 +259,14 @@ class LotteryApp:
             style='TButton'
         )
         self.bg_btn.pack(side=tk.LEFT, padx=5, expand=True)
+
+        # Only shown while a file is being loaded
+        self.cancel_load_btn = ttk.Button(
+            button_frame,
+            text="⛔ لغو بارگذاری",
+            command=self.cancel_load,
+            style='TButton'
+        )
         
         # Settings frame
         settings_frame = ttk.Frame(main_frame)
@@ -268,129 +362,275 @@ class LotteryApp:
         messagebox.showinfo("درباره برنامه", about_text)
 
     def show_previous_winners(self):
-        if not self.previous_winners:
+        if len(self.registry) == 0:
             messagebox.showinfo("برندگان", "هنوز برنده‌ای انتخاب نشده است.")
             return
-            
-        win_text = "\n\n".join([
-            f"{i+1}- {name}\nکد ملی: {nid} / تلفن: {self.mask_phone(phone)}"
-            for i, (name, nid, phone) in enumerate(self.previous_winners)
-        ])
-        
-        # Create new window for winners
-        win_window = tk.Toplevel(self.root)
-        win_window.title("لیست برندگان قبلی")
-        win_window.geometry("600x400")
-        
-        # Center the window
-        win_window.update_idletasks()
-        width = win_window.winfo_width()
-        height = win_window.winfo_height()
-        x = (win_window.winfo_screenwidth() // 2) - (width // 2)
-        y = (win_window.winfo_screenheight() // 2) - (height // 2)
-        win_window.geometry(f'+{x}+{y}')
-        
-        # Use ScrolledText for long lists
-        text_area = scrolledtext.ScrolledText(
-            win_window,
-            wrap=tk.WORD,
-            font=('B Titr', 12),
-            bg=self.text_bg,
-            fg=self.fg_color,
-            padx=10,
-            pady=10
-        )
-        text_area.pack(fill=tk.BOTH, expand=True)
-        text_area.insert(tk.INSERT, win_text)
-        text_area.config(state=tk.DISABLED)
-        
-        close_btn = ttk.Button(
-            win_window,
-            text="بستن",
-            command=win_window.destroy
-        )
-        close_btn.pack(pady=10)
+
+        # Pages are read from the registry, so all sessions' winners are listed
+        browser = WinnersBrowser(self.root, self.registry, self.bg_color, self.fg_color, self.text_bg)
+        browser.update_idletasks()
+        x = (browser.winfo_screenwidth() // 2) - (browser.winfo_width() // 2)
+        y = (browser.winfo_screenheight() // 2) - (browser.winfo_height() // 2)
+        browser.geometry(f'+{x}+{y}')
 
     def clear_winners(self):
-        if messagebox.askyesno("تأیید", "آیا مطمئن هستید که می‌خواهید لیست برندگان قبلی پاک شود؟"):
-            self.previous_winners = []
+        if messagebox.askyesno("تأیید", "آیا مطمئن هستید که می‌خواهید لیست برندگان قبلی پاک شود؟\n"
+                                        "برندگان جلسات قبل هم دوباره در قرعه‌کشی شرکت داده می‌شوند."):
+            try:
+                self.registry.clear()
+                if self.load_id is not None:
+                    self.load_id = self.audit.record_reset(self.load_id)
+            except Exception as e:
+                messagebox.showerror("خطا", f"خطا در پاک کردن فهرست برندگان:\n{e}")
+                return
+            self.session_draws = []
+            self.engine = DrawEngine(ParticipantPool(self.entries))
             messagebox.showinfo("موفق", "لیست برندگان قبلی پاک شد.")
             self.status_bar.config(text="لیست برندگان قبلی پاک شد")
 
     def save_winners_explicit(self):
-        if not self.previous_winners:
+        if self.export_thread is not None:
+            messagebox.showwarning("هشدار", "ذخیره نتایج قبلی هنوز تمام نشده است.")
+            return
+        if not self.session_draws:
             messagebox.showwarning("هشدار", "لیست برندگان خالی است.")
             return
-            
+
         file_path = filedialog.asksaveasfilename(
             defaultextension=".xlsx",
-            filetypes=[("Excel files", "*.xlsx"), ("All files", "*.*")],
+            filetypes=export_filetypes() + [("All files", "*.*")],
             title="ذخیره نتایج به عنوان"
         )
-        
-        if file_path:
-            try:
-                wb = Workbook()
-                ws = wb.active
-                ws.title = "Winners"
-                ws.append(["ردیف", "نام", "کد ملی", "شماره موبایل (مخفی)", "تاریخ قرعه‌کشی"])
-                
-                # Set column widths
-                ws.column_dimensions['A'].width = 10
-                ws.column_dimensions['B'].width = 30
-                ws.column_dimensions['C'].width = 20
-                ws.column_dimensions['D'].width = 20
-                ws.column_dimensions['E'].width = 20
-                
-                for i, (name, national_id, phone) in enumerate(self.previous_winners, start=1):
-                    ws.append([
-                        i,
-                        name,
-                        national_id,
-                        self.mask_phone(phone),
-                        datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    ])
-                
-                wb.save(file_path)
-                messagebox.showinfo("موفق", f"نتایج با موفقیت در {file_path} ذخیره شد.")
-                self.status_bar.config(text=f"نتایج در {os.path.basename(file_path)} ذخیره شد")
-            except Exception as e:
-                messagebox.showerror("خطا", f"خطا در ذخیره فایل:\n{e}")
-                self.status_bar.config(text="خطا در ذخیره نتایج")
+        if not file_path:
+            return
+
+        # Writing hundreds of thousands of rows takes seconds, keep the UI responsive
+        self.status_bar.config(text="در حال ذخیره نتایج...")
+        self.export_queue = queue.Queue()
+        self.export_cancel = threading.Event()
+        self.export_thread = threading.Thread(
+            target=self.export_worker,
+            args=(file_path, list(self.session_draws), self.export_queue, self.export_cancel),
+            daemon=True
+        )
+        self.export_thread.start()
+        self.root.after(100, self.poll_export_queue)
+
+    def export_worker(self, file_path, draws, export_queue, cancel_event):
+        """Runs on the export thread, reports to the Tk thread through export_queue"""
+        try:
+            with METRICS.span("export.save_as"):
+                rows = export_results(
+                    file_path,
+                    draws,
+                    progress=lambda written, total: export_queue.put(("progress", written, total)),
+                    cancel_event=cancel_event
+                )
+            METRICS.count("rows_exported", rows)
+        except ExportCancelled:
+            export_queue.put(("cancelled",))
+        except Exception as e:
+            export_queue.put(("error", e))
+        else:
+            export_queue.put(("done", file_path, rows))
+
+    def poll_export_queue(self):
+        """Show export progress on the Tk thread, rescheduling until the export finishes"""
+        message = None
+        try:
+            while True:
+                message = self.export_queue.get_nowait()
+                if message[0] != "progress":
+                    break
+        except queue.Empty:
+            pass
+        if message is None or message[0] == "progress":
+            if message is not None:
+                _, written, total = message
+                self.status_bar.config(text=f"در حال ذخیره نتایج... {written} از {total} ردیف")
+            self.root.after(100, self.poll_export_queue)
+            return
+
+        self.export_thread = None
+        if message[0] == "done":
+            _, file_path, rows = message
+            messagebox.showinfo("موفق", f"نتایج با موفقیت در {file_path} ذخیره شد.")
+            self.status_bar.config(text=f"{rows} ردیف در {os.path.basename(file_path)} ذخیره شد")
+        elif message[0] == "cancelled":
+            self.status_bar.config(text="ذخیره نتایج لغو شد")
+        else:
+            messagebox.showerror("خطا", f"خطا در ذخیره فایل:\n{message[1]}")
+            self.status_bar.config(text="خطا در ذخیره نتایج")
 
     def load_excel(self):
+        if self.load_thread is not None:
+            return
+
         file_path = filedialog.askopenfilename(
-            filetypes=[("Excel files", "*.xlsx *.xls"), ("All files", "*.*")],
+            filetypes=[("Participant files", supported_patterns()), ("All files", "*.*")],
             title="لطفاً فایل Excel را انتخاب کنید"
         )
         if not file_path:
             return
         
         self.status_bar.config(text="در حال بارگذاری فایل...")
-        self.root.update()
-        
-        try:
-            wb = load_workbook(file_path)
-            sheet = wb.active
-            self.entries = []
-
-            for row in sheet.iter_rows(min_row=1, values_only=True):
-                if len(row) >= 3:  # Ensure we have at least 3 columns
-                    name, national_id, phone = row[:3]
-                    if name and national_id and phone:
-                        self.entries.append((str(name).strip(), str(national_id).strip(), str(phone).strip()))
-
-            if not self.entries:
-                messagebox.showwarning("هشدار", "فایل انتخاب شده حاوی اطلاعات معتبر نیست.")
-                self.status_bar.config(text="فایل حاوی اطلاعات معتبر نیست")
-                return
+        self.excel_btn.config(state=tk.DISABLED)
+        self.start_btn.config(state=tk.DISABLED)
+        self.cancel_load_btn.pack(side=tk.RIGHT, padx=5)
+
+        self.load_queue = queue.Queue()
+        self.load_cancel = threading.Event()
+        self.load_thread = threading.Thread(
+            target=self.load_worker,
+            args=(file_path, self.load_queue, self.load_cancel, self.dedup_policy.get(),
+                  True if self.weight_column.get() else None),
+            daemon=True
+        )
+        self.load_thread.start()
+        self.root.after(100, self.poll_load_queue)
+
+    def load_worker(self, file_path, load_queue, cancel_event, dedup_policy, weights):
+        """Parse file_path off the Tk thread and report back through load_queue"""
+        # Imported here so the loader and its dependencies stay out of startup
+        from loader import load_participants, LoadCancelled
 
-            self.count_label.config(text=f"👥 تعداد افراد: {len(self.entries)}")
-            self.status_bar.config(text=f"فایل با موفقیت بارگذاری شد. تعداد شرکت‌کنندگان: {len(self.entries)}")
-            messagebox.showinfo("موفق", "اطلاعات با موفقیت بارگذاری شد.")
+        try:
+            with METRICS.span("load.parse"):
+                entries, stats = load_participants(
+                    file_path,
+                    progress=lambda s: load_queue.put(("progress", s.rows, s.percent, s.eta)),
+                    cancel_event=cancel_event,
+                    dedup=dedup_policy,
+                    weights=weights
+                )
+            METRICS.count("rows_loaded", stats.rows)
+            METRICS.count("entries_loaded", len(entries))
+            # Matching against past winners is part of the load, not of the Tk thread
+            with METRICS.span("load.past_winners"):
+                winner_indices = self.registry.winner_indices(entries)
+            METRICS.count("past_winners_excluded", len(winner_indices))
+            if cancel_event.is_set():
+                raise LoadCancelled(file_path)
+            with METRICS.span("load.audit"):
+                load_id = self.audit.record_load(file_path, stats.sha256, dedup_policy, len(entries),
+                                                 winner_indices, weights)
+            load_queue.put(("done", entries, stats, winner_indices, load_id))
+        except LoadCancelled:
+            load_queue.put(("cancelled",))
         except Exception as e:
-            messagebox.showerror("خطا", f"در خواندن فایل مشکلی پیش آمد:\n{str(e)}")
+            load_queue.put(("error", e))
+
+    def poll_load_queue(self):
+        """Drain worker messages on the Tk thread, rescheduling until the load finishes"""
+        finished = False
+        try:
+            while True:
+                message = self.load_queue.get_nowait()
+                kind = message[0]
+                if kind == "progress":
+                    self.show_load_progress(*message[1:])
+                    continue
+                finished = True
+                self.finish_load(message)
+                break
+        except queue.Empty:
+            pass
+        if not finished:
+            self.root.after(100, self.poll_load_queue)
+
+    def show_load_progress(self, rows, percent, eta):
+        text = f"در حال بارگذاری فایل... {rows} ردیف"
+        if percent is not None:
+            text += f" ({percent:.0f}%)"
+        if eta is not None:
+            text += f" - زمان باقیمانده: {eta:.0f} ثانیه"
+        self.status_bar.config(text=text)
+        self.count_label.config(text=f"👥 ردیف‌های خوانده شده: {rows}")
+
+    def finish_load(self, message):
+        self.load_thread = None
+        self.cancel_load_btn.pack_forget()
+        self.excel_btn.config(state=tk.NORMAL)
+        self.start_btn.config(state=tk.NORMAL)
+        # Restore the count of the entries that are still in use
+        self.count_label.config(text=f"👥 تعداد افراد: {len(self.entries)}")
+
+        kind = message[0]
+        if kind == "cancelled":
+            self.status_bar.config(text="بارگذاری فایل لغو شد")
+            return
+        if kind == "error":
+            messagebox.showerror("خطا", f"در خواندن فایل مشکلی پیش آمد:\n{str(message[1])}")
             self.status_bar.config(text="خطا در بارگذاری فایل")
+            return
+
+        entries, stats, winner_indices, load_id = message[1:5]
+        if not entries:
+            messagebox.showwarning("هشدار", "فایل انتخاب شده حاوی اطلاعات معتبر نیست.")
+            self.status_bar.config(text="فایل حاوی اطلاعات معتبر نیست")
+            return
+
+        # Only a fully parsed file ever replaces the current entries
+        self.entries = entries
+        self.load_id = load_id
+        with METRICS.span("load.pool"):
+            self.spinner_feed = SpinnerFeed(entries)
+            pool = ParticipantPool(entries)
+            pool.remove_indices(winner_indices)
+            self.engine = DrawEngine(pool)
+        self.count_label.config(text=f"👥 تعداد افراد: {len(self.entries)}")
+        if stats.from_cache:
+            speed = f"از فایل ذخیره‌شده در {stats.elapsed * 1000:.0f} میلی‌ثانیه"
+        else:
+            speed = f"{stats.rows_per_sec:.0f} ردیف در ثانیه"
+        tickets = ""
+        if entries.weights is not None:
+            tickets = f"، تعداد بلیت‌ها: {sum(entries.weights)}"
+        if winner_indices:
+            tickets += f"، برندگان قبلی حذف‌شده: {len(winner_indices)}"
+        self.status_bar.config(
+            text=f"فایل با موفقیت بارگذاری شد. تعداد شرکت‌کنندگان: {len(self.entries)}{tickets} ({speed})"
+        )
+        messagebox.showinfo("موفق", "اطلاعات با موفقیت بارگذاری شد.")
+        if stats.invalid_weights:
+            examples = "\n".join(f"ردیف {row}: {value}" for row, value in stats.invalid_weight_examples)
+            messagebox.showwarning(
+                "تعداد بلیت نامعتبر",
+                f"{stats.invalid_weights} ردیف به دلیل تعداد بلیت نامعتبر کنار گذاشته شد "
+                f"(تعداد بلیت باید عدد صحیح مثبت باشد):\n\n{examples}"
+            )
+        if stats.duplicates is not None and stats.duplicates.duplicate_rows:
+            self.show_duplicate_report(stats.duplicates)
+
+    def show_duplicate_report(self, report):
+        top = "\n".join(f"{national_id}: {count} بار" for national_id, count in report.top[:5])
+        if report.complete:
+            question = "آیا گزارش کامل ذخیره شود؟"
+        else:
+            # A report read back without its row counts only knows the top list
+            question = f"آیا فهرست {len(report.top)} کد ملی پرتکرار ذخیره شود؟"
+        if not messagebox.askyesno(
+            "ردیف‌های تکراری",
+            f"{report.duplicate_rows} ردیف تکراری برای {report.duplicated_ids} کد ملی پیدا شد "
+            f"({POLICY_LABELS[report.policy]}).\n\n{top}\n\n{question}"
+        ):
+            return
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")],
+            title="ذخیره گزارش تکراری‌ها"
+        )
+        if file_path:
+            try:
+                report.write_csv(file_path)
+                self.status_bar.config(text=f"گزارش تکراری‌ها در {os.path.basename(file_path)} ذخیره شد")
+            except Exception as e:
+                messagebox.showerror("خطا", f"خطا در ذخیره گزارش:\n{e}")
+
+    def cancel_load(self):
+        if self.load_thread is not None:
+            self.load_cancel.set()
+            self.status_bar.config(text="در حال لغو بارگذاری...")
 
     def select_background(self):
         path = filedialog.askopenfilename(
@@ -399,11 +639,15 @@ class LotteryApp:
         )
         if path:
             try:
+                from PIL import Image
+
                 # Verify it's a valid image file
                 with Image.open(path) as img:
                     self.bg_path = path
-                    messagebox.showinfo("ثبت شد", "تصویر پس‌زمینه تنظیم شد.")
-                    self.status_bar.config(text="تصویر پس‌زمینه انتخاب شد")
+                # Resize in the background while the user reads the message
+                self.image_cache.prewarm(path, self.screen_size())
+                messagebox.showinfo("ثبت شد", "تصویر پس‌زمینه تنظیم شد.")
+                self.status_bar.config(text="تصویر پس‌زمینه انتخاب شد")
             except Exception as e:
                 messagebox.showerror("خطا", f"فایل انتخاب شده یک تصویر معتبر نیست:\n{e}")
                 self.status_bar.config(text="خطا در انتخاب تصویر")
@@ -426,289 +670,171 @@ class LotteryApp:
             self.status_bar.config(text="خطا: مقادیر ورودی نامعتبر")
             return
 
-        available_entries = [e for e in self.entries if e not in self.previous_winners]
+        self.begin_draw()
 
-        if self.winner_count > len(available_entries):
-            messagebox.showerror("خطا", f"تعداد برنده‌ها بیشتر از افراد باقیمانده است. فقط {len(available_entries)} شرکت‌کننده باقی مانده.")
-            self.status_bar.config(text=f"خطا: فقط {len(available_entries)} شرکت‌کننده باقی مانده")
+    def begin_draw(self):
+        """Start a draw with the current settings, also used by the retry button"""
+        if self.winner_count > self.engine.remaining:
+            if self.stage is not None:
+                self.stage.hide()
+            messagebox.showerror("خطا", f"تعداد برنده‌ها بیشتر از افراد باقیمانده است. فقط {self.engine.remaining} شرکت‌کننده باقی مانده.")
+            self.status_bar.config(text=f"خطا: فقط {self.engine.remaining} شرکت‌کننده باقی مانده")
             return
 
+        self.drawing = True
         self.start_btn.config(state=tk.DISABLED)
         self.status_bar.config(text="در حال آماده‌سازی قرعه‌کشی...")
-        threading.Thread(target=self.run_lottery, daemon=True).start()
+        self.run_lottery()
 
     def run_lottery(self):
-        popup = tk.Toplevel(self.root)
-        popup.attributes('-fullscreen', True)
-        popup.configure(bg='black')
-        popup.title("قرعه‌کشی در حال انجام...")
-
-        # Display background image
-        bg_img = None
+        start = time.perf_counter()
+        if self.stage is None or not self.stage.exists():
+            # Built on the first draw of the session and reused afterwards
+            self.stage = DrawStage(self.root, on_retry=self.retry_lottery, on_hide=self.on_stage_hidden)
+        # The seed is fixed before the countdown and only its commitment is shown
+        self.draw_seed = new_seed()
+
+        # Display background image, the cached photo is only set again when it changed
         try:
-            if self.bg_path and os.path.exists(self.bg_path):
-                bg_img = Image.open(self.bg_path)
-            elif os.path.exists(self.default_bg):
-                bg_img = Image.open(self.default_bg)
-                
-            if bg_img:
-                screen_width = popup.winfo_screenwidth()
-                screen_height = popup.winfo_screenheight()
-                
-                # Maintain aspect ratio while resizing
-                img_ratio = bg_img.width / bg_img.height
-                screen_ratio = screen_width / screen_height
-                
-                if img_ratio > screen_ratio:
-                    # Image is wider than screen
-                    new_width = screen_width
-                    new_height = int(screen_width / img_ratio)
-                else:
-                    # Image is taller than screen
-                    new_height = screen_height
-                    new_width = int(screen_height * img_ratio)
-                
-                bg_img = bg_img.resize((new_width, new_height), Image.LANCZOS)
-                bg_photo = ImageTk.PhotoImage(bg_img)
-                bg_label = tk.Label(popup, image=bg_photo)
-                bg_label.image = bg_photo
-                bg_label.place(x=(screen_width - new_width) // 2, y=(screen_height - new_height) // 2)
+            bg_path = self.current_bg_path()
+            photo = self.image_cache.photo(bg_path, self.screen_size()) if bg_path else None
+            self.stage.set_background(photo, self.screen_size())
         except Exception as e:
             print(f"Error loading background: {e}")
-
-        # Countdown
-        countdown_label = tk.Label(
-            popup, 
-            font=("B Titr", 100), 
-            fg="white", 
-            bg="black",
-            relief=tk.RAISED,
-            bd=5
-        )
-        countdown_label.place(relx=0.5, rely=0.5, anchor="center")
-
-        for i in range(self.countdown_seconds, 0, -1):
-            countdown_label.config(text=str(i))
-            popup.update()
-            time.sleep(1)
-
-        countdown_label.destroy()
-
-        # Spinner display
-        spin_label = tk.Label(
-            popup, 
-            font=("B Titr", 40),
-            fg="yellow", 
-            bg="black", 
-            justify="center",
-            relief=tk.RAISED,
-            bd=5,
-            anchor='center'
-        )
-        spin_label.place(relx=0.5, rely=0.5, anchor="center")
-
-        self.is_spinning = True
-        spinner_thread = threading.Thread(target=self.spin_names, args=(popup, spin_label))
-        spinner_thread.start()
-
-        popup.after(self.countdown_seconds * 1000, lambda: self.stop_spinning(popup, spin_label))
-
-        # Control buttons
-        control_frame = tk.Frame(popup, bg='black')
-        control_frame.place(relx=0.5, rely=0.9, anchor="center")
-        
-        retry_btn = tk.Button(
-            control_frame, 
-            text="🔁 قرعه‌کشی مجدد", 
-            font=("B Titr", 20), 
-            command=lambda: self.retry_lottery(popup, spin_label), 
-            bg="#007bff", 
-            fg="white",
-            padx=20,
-            pady=10,
-            bd=0,
-            relief=tk.RAISED
+            self.stage.set_background(None, self.screen_size())
+
+        self.stage.reset(f"کد تعهد: {commitment(self.draw_seed)}")
+        self.stage.scheduler.animate(
+            lambda frame: self.stage.show_countdown(self.countdown_seconds - frame),
+            fps=1,
+            duration=self.countdown_seconds,
+            on_done=self.start_spinning
         )
-        retry_btn.pack(side=tk.LEFT, padx=10)
-        
-        close_btn = tk.Button(
-            control_frame, 
-            text="✕ بستن", 
-            font=("B Titr", 20), 
-            command=popup.destroy, 
-            bg="#dc3545", 
-            fg="white",
-            padx=20,
-            pady=10,
-            bd=0,
-            relief=tk.RAISED
+        METRICS.record("draw.stage_setup", time.perf_counter() - start)
+
+    def start_spinning(self):
+        self.stage.start_spinner()
+        self.spin_animation = self.stage.scheduler.animate(
+            lambda frame: self.spin_names(),
+            fps=HIGH_REFRESH_FPS if self.high_refresh.get() else SPIN_FPS,
+            duration=self.countdown_seconds,
+            on_done=self.stop_spinning
         )
-        close_btn.pack(side=tk.RIGHT, padx=10)
 
-        popup.bind("<Escape>", lambda e: popup.destroy())
-
-    def spin_names(self, popup, label):
-        while self.is_spinning:
-            entry = random.choice(self.entries)
-            print(self.mask_phone(entry[2]))
-            name_text = f"{entry[0]}\n{entry[1]} / {self.mask_phone(entry[2])}"
-            label.config(text=name_text)
-            popup.update()
-            time.sleep(0.1)
-
-    def stop_spinning(self, popup, label):
-        self.is_spinning = False
-
-        available_entries = [e for e in self.entries if e not in self.previous_winners]
-        winners = random.sample(available_entries, self.winner_count)
-
-        # Create frame for winners with scrollbar
-        result_frame = tk.Frame(popup, bg='black')
-        result_frame.place(relx=0.5, rely=0.5, anchor="center", relwidth=0.9, relheight=0.7)
-        
-        canvas = tk.Canvas(result_frame, bg='black', highlightthickness=0)
-        scrollbar = tk.Scrollbar(result_frame, orient="vertical", command=canvas.yview)
-        scrollable_frame = tk.Frame(canvas, bg='black')
-        
-        scrollable_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(
-                scrollregion=canvas.bbox("all")
-            )
-        )
-        
-        canvas.create_window((0, 0), window=scrollable_frame, anchor="center")
-        canvas.configure(yscrollcommand=scrollbar.set)
-        
-        canvas.pack(side="left", fill="both", expand=True)
-        scrollbar.pack(side="right", fill="y")
-
-        # Set font size based on number of winners
-        if self.winner_count <= 3:
-            font_size = 40
-        elif self.winner_count <= 6:
-            font_size = 30
-        elif self.winner_count <= 10:
-            font_size = 24
-        elif self.winner_count <= 20:
-            font_size = 18
-        else:
-            font_size = 14
-
-        # Create a centered container for winners
-        center_frame = tk.Frame(scrollable_frame, bg='black')
-        center_frame.pack()
-        
-        # Display winners in a centered column
-        for i, (name, national_id, phone) in enumerate(winners, start=1):
-            winner_frame = tk.Frame(
-                center_frame, 
-                bg=self.winner_bg, 
-                bd=2, 
-                relief=tk.RAISED,
-                padx=20,
-                pady=10
-            )
-            winner_frame.pack(pady=10, anchor='center', expand=True)
-            # Winner number
-            # tk.Label(
-            #     winner_frame,
-            #     text=f"برنده شماره {i}",
-            #     font=("B Titr", font_size-4),
-            #     fg=self.highlight_color,
-            #     bg=self.winner_bg,
-            #     anchor='center'
-            # ).pack(fill=tk.X, expand=True)
-            
-            # Winner name
-            tk.Label(
-                winner_frame,
-                text=f"🏆 {name}",
-                font=("B Titr", font_size),
-                fg=self.highlight_color,
-                bg=self.winner_bg,
-                anchor='center'
-            ).pack(fill=tk.X, expand=True)
-            
-            # National ID
-            tk.Label(
-                winner_frame,
-                text=f"کد ملی: {national_id}",
-                font=("B Titr", font_size-4),
-                fg=self.winner_fg,
-                bg=self.winner_bg,
-                anchor='center'
-            ).pack(fill=tk.X, expand=True)
-            # Phone number
-            tk.Label(
-                winner_frame,
-                text=f"تلفن: {self.mask_phone(phone).split()[::-1][0]}",
-                font=("B Titr", font_size-4),
-                fg=self.winner_fg,
-                bg=self.winner_bg,
-                anchor='center'
-            ).pack(fill=tk.X, expand=True)
-
-        self.previous_winners.extend(winners)
-        self.save_winners_to_excel(winners)
+    def spin_names(self):
+        """Show one random participant, called once per spinner frame"""
+        self.stage.show_name(self.spinner_feed.next())
+
+    def stop_spinning(self):
+        self.drawing = False
+        frames = self.spin_animation.stats
+        print(f"Spinner frames: {frames}")
+        METRICS.count("frames_rendered", frames.frames)
+        METRICS.count("frames_dropped", frames.dropped)
+
+        draw_id = self.audit.next_draw_id(self.load_id)
+        with METRICS.span("draw.select"):
+            self.engine.rng = draw_rng(self.draw_seed, self.audit.loads[self.load_id]["sha256"], draw_id)
+            indices = self.engine.draw_indices(self.winner_count)
+            winners = [self.entries[i] for i in indices]
+        METRICS.count("draws")
+        METRICS.count("winners_drawn", len(winners))
+        self.stage.add_audit_line(f"شناسه: {draw_id}   بذر: {self.draw_seed.hex()}")
+
+        with METRICS.span("draw.widgets"):
+            self.stage.show_winners(winners, self.winner_bg, self.winner_fg, self.highlight_color)
+
+        with METRICS.span("draw.save"):
+            self.save_winners(winners, draw_id, indices)
+        self.results_dirty = True
 
         self.start_btn.config(state=tk.NORMAL)
         self.status_bar.config(text=f"قرعه‌کشی با موفقیت انجام شد. {len(winners)} برنده انتخاب شدند.")
 
-    def retry_lottery(self, popup, label):
-        popup.destroy()
-        self.start_lottery()
-
-    def mask_phone(self, phone):
-        phone = str(phone).strip()
-        
-        # Remove all non-digit characters
-        cleaned = ''.join(filter(str.isdigit, phone))
-        
-        # Validate Iranian mobile number
-        if len(cleaned) != 11 or not cleaned.startswith('09'):
-            return cleaned
-        
-        # Mask the phone number
-        return f"{cleaned[7:]}***{cleaned[:4]}"
+    def on_stage_hidden(self):
+        if self.drawing:
+            # Closed before the draw finished, so no winners were taken
+            self.drawing = False
+            self.start_btn.config(state=tk.NORMAL)
+            self.status_bar.config(text="قرعه‌کشی لغو شد")
+
+    def retry_lottery(self):
+        # The stage stays up: reset in place instead of rebuilding the window
+        self.stage.scheduler.cancel_all()
+        self.begin_draw()
+
+    def save_winners(self, winners, draw_id, indices):
+        # One timestamp per draw, shared by the journal, the registry and exports
+        drawn_at = datetime.now()
+        audit = (draw_id, self.draw_seed.hex(), self.audit.loads[self.load_id]["sha256"])
+        self.session_draws.append((drawn_at, audit, winners))
+        try:
+            self.audit.record_draw(self.load_id, draw_id, self.draw_seed, indices,
+                                   [winner[1] for winner in winners], drawn_at)
+            self.results.append(winners, drawn_at, audit=audit)
+            self.registry.add(winners, drawn_at)
+            self.status_bar.config(text=f"نتایج در فایل {self.results.path} ثبت شد.")
+        except Exception as e:
+            messagebox.showerror("خطا", f"خطا در ذخیره فایل برندگان:\n{e}")
+            self.status_bar.config(text="خطا در ذخیره نتایج")
 
-    def save_winners_to_excel(self, winners):
+    def export_winners_xlsx(self, show_message=True):
+        """Rebuild winners.xlsx from the results journal"""
         try:
-            file_exists = os.path.exists("winners.xlsx")
-            
-            if file_exists:
-                wb = load_workbook("winners.xlsx")
-                ws = wb.active
-            else:
-                wb = Workbook()
-                ws = wb.active
-                ws.title = "Winners"
-                ws.append(["ردیف", "نام", "کد ملی", "شماره موبایل (مخفی)", "تاریخ قرعه‌کشی"])
-                # Set column widths
-                ws.column_dimensions['A'].width = 10
-                ws.column_dimensions['B'].width = 30
-                ws.column_dimensions['C'].width = 20
-                ws.column_dimensions['D'].width = 20
-                ws.column_dimensions['E'].width = 20
-
-            start_row = ws.max_row + 1
-            
-            for i, (name, national_id, phone) in enumerate(winners, start=start_row):
-                ws.append([
-                    i-start_row+1,
-                    name,
-                    national_id,
-                    self.mask_phone(phone),
-                    datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                ])
-
-            wb.save("winners.xlsx")
-            self.status_bar.config(text=f"نتایج در فایل winners.xlsx ذخیره شد.")
+            with METRICS.span("export.winners_xlsx"):
+                self.results.export_xlsx("winners.xlsx")
+            self.status_bar.config(text="نتایج در فایل winners.xlsx ذخیره شد.")
+            if show_message:
+                messagebox.showinfo("موفق", "نتایج در فایل winners.xlsx ذخیره شد.")
         except Exception as e:
             messagebox.showerror("خطا", f"خطا در ذخیره فایل برندگان:\n{e}")
             self.status_bar.config(text="خطا در ذخیره نتایج")
 
+    def save_metrics(self):
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".json",
+            filetypes=[("JSON", "*.json"), ("Prometheus", "*.prom"), ("All files", "*.*")],
+            title="ذخیره آمار عملکرد"
+        )
+        if not file_path:
+            return
+        try:
+            METRICS.write(file_path)
+            self.status_bar.config(text=f"آمار عملکرد در {os.path.basename(file_path)} ذخیره شد")
+        except Exception as e:
+            messagebox.showerror("خطا", f"خطا در ذخیره آمار عملکرد:\n{e}")
+
+    def toggle_profiling(self):
+        try:
+            if self.profiling.get():
+                self.profiler.start()
+                self.status_bar.config(text="پروفایل‌گیری شروع شد")
+                return
+            profile_path, summary_path = self.profiler.stop()
+        except Exception as e:
+            self.profiling.set(self.profiler.running)
+            messagebox.showerror("خطا", f"خطا در پروفایل‌گیری:\n{e}")
+            return
+        messagebox.showinfo("پروفایل", f"نتایج پروفایل ذخیره شد:\n{profile_path}\n{summary_path}")
+        self.status_bar.config(text=f"پروفایل در {os.path.basename(profile_path)} ذخیره شد")
+
+    def on_close(self):
+        if self.export_thread is not None:
+            # Stops at the next chunk and removes the unfinished file
+            self.export_cancel.set()
+            self.export_thread.join()
+        if self.profiler.running:
+            self.profiler.stop()
+        # End of session: refresh winners.xlsx once instead of after every draw
+        if self.results_dirty:
+            self.export_winners_xlsx(show_message=False)
+        self.root.quit()
+
 if __name__ == "__main__":
+    import multiprocessing
+
+    # Needed for the sheet parsing process pool in PyInstaller builds
+    multiprocessing.freeze_support()
     root = tk.Tk()
     app = LotteryApp(root)
     root.mainloop()
\ No newline at end of file
@@ -0,0 +1,371 @@
+"""Streaming participant loader for large participant files"""
+import os
+import re
+import time
+from array import array
+from concurrent import futures
+from itertools import compress
+
+from dedup import DEFAULT_POLICY, Deduplicator, DuplicateReport
+from national_ids import normalize_national_id_column
+from phones import DIGIT_TRANSLATION, normalize_phone_column
+from readers import XLSX_EXTENSIONS, get_reader, read_xlsx, xlsx_first_row, xlsx_sheet_sizes
+from store import MAX_WEIGHT, ParticipantStore
+from snapshot import DEFAULT_CACHE_DIR, file_sha256, load_snapshot, write_snapshot
+
+PROGRESS_EVERY = 10000
+NORMALIZE_CHUNK = 10000
+# A fourth column with one of these in its header holds ticket counts
+WEIGHT_HEADER = re.compile(r"بلیت|بلیط|شانس|ticket|weight", re.IGNORECASE)
+# Rows with an invalid ticket count listed in the load report
+INVALID_WEIGHT_EXAMPLES = 5
+
+
+class LoadCancelled(Exception):
+    """Raised when a load is cancelled before the whole file was read"""
+
+
+class LoadStats:
+    """Counters collected while reading a participant file"""
+
+    def __init__(self):
+        self.rows = 0
+        self.entries = 0
+        self.elapsed = 0.0
+        self.total_rows = None
+        self.from_cache = False
+        self.duplicates = None
+        # Whether the fourth column was read as ticket counts
+        self.weight_column = False
+        # Rows left out for an invalid ticket count, and (row number, value) of the first few
+        self.invalid_weights = 0
+        self.invalid_weight_examples = []
+        # SHA-256 of the participant file the entries came from
+        self.sha256 = None
+
+    @property
+    def rows_per_sec(self):
+        if self.elapsed <= 0:
+            return 0.0
+        return self.rows / self.elapsed
+
+    @property
+    def percent(self):
+        """Share of the sheet already read, or None when the sheet size is unknown"""
+        if not self.total_rows:
+            return None
+        return min(100.0, 100.0 * self.rows / self.total_rows)
+
+    @property
+    def eta(self):
+        """Estimated seconds left, or None when it cannot be estimated yet"""
+        if not self.total_rows or not self.rows_per_sec:
+            return None
+        return max(0.0, (self.total_rows - self.rows) / self.rows_per_sec)
+
+    def add_invalid_weight(self, row_number, value):
+        self.invalid_weights += 1
+        if len(self.invalid_weight_examples) < INVALID_WEIGHT_EXAMPLES:
+            self.invalid_weight_examples.append((row_number, str(value)))
+
+    def weight_report(self):
+        """JSON data of the weight column, kept with snapshots"""
+        return {
+            "column": self.weight_column,
+            "invalid": self.invalid_weights,
+            "examples": self.invalid_weight_examples,
+        }
+
+    def set_weight_report(self, data):
+        self.weight_column = data["column"]
+        self.invalid_weights = data["invalid"]
+        self.invalid_weight_examples = [tuple(example) for example in data["examples"]]
+
+    def __repr__(self):
+        return (f"LoadStats(rows={self.rows}, entries={self.entries}, "
+                f"elapsed={self.elapsed:.2f}s, rows_per_sec={self.rows_per_sec:.0f})")
+
+
+def is_weight_header(value):
+    return isinstance(value, str) and WEIGHT_HEADER.search(value) is not None
+
+
+def parse_weight(value):
+    """Ticket count of a weight cell, or None unless it is a whole number from 1 to MAX_WEIGHT
+
+    Numeric text is read like a numeric cell, so "3", "3.0" and 3.0 are
+    three tickets in every file format, and "2.7" or "-3" are invalid like
+    2.7 and -3. An empty cell is one ticket.
+    """
+    if value is None:
+        return 1
+    if isinstance(value, str):
+        value = value.strip().translate(DIGIT_TRANSLATION)
+        if not value:
+            return 1
+        try:
+            value = int(value)
+        except ValueError:
+            try:
+                value = float(value)
+            except ValueError:
+                return None
+    try:
+        weight = int(value)
+    except (TypeError, ValueError, OverflowError):
+        return None
+    if weight != value or not 0 < weight <= MAX_WEIGHT:
+        return None
+    return weight
+
+
+def cell_text(value):
+    """Stripped text of a cell, whole-number floats without their ".0"
+
+    xlrd (and float columns in other formats) read every number as a float,
+    and "9121234567.0" would otherwise normalize to an extra trailing zero.
+    """
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def parse_row(row, weight_column=False):
+    """Turn a raw sheet row into a (name, national_id, phone, weight) tuple, or None if invalid
+
+    With weight_column the fourth column is the participant's ticket count,
+    and weight is None when that count is invalid. Otherwise any columns
+    after the third are ignored.
+    """
+    if len(row) < 3:  # Ensure we have at least 3 columns
+        return None
+    name, national_id, phone = row[:3]
+    if not (name and national_id and phone):
+        return None
+    weight = parse_weight(row[3]) if weight_column and len(row) > 3 else 1
+    return (cell_text(name), cell_text(national_id), cell_text(phone), weight)
+
+
+def normalize_chunk(raw_entries):
+    """Turn raw entry tuples into (names, national_ids, phones, weights) columns
+
+    National IDs and phones are normalized for the whole chunk at once.
+    Rows whose national ID has no digits or whose phone normalizes to
+    nothing, such as a header row, are dropped.
+    weights is None when every row has a single ticket.
+    """
+    if not raw_entries:
+        return (), [], [], None
+    names, national_ids, phones, weights = zip(*raw_entries)
+    national_ids = normalize_national_id_column(national_ids)
+    phones = normalize_phone_column(phones)
+    # Header rows and other text-only rows have no digits in the ID or phone
+    keep = [any(map(str.isdigit, national_id)) and phone != ""
+            for national_id, phone in zip(national_ids, phones)]
+    if not all(keep):
+        names = tuple(compress(names, keep))
+        national_ids = list(compress(national_ids, keep))
+        phones = list(compress(phones, keep))
+        weights = tuple(compress(weights, keep))
+    weights = None if weights.count(1) == len(weights) else array('I', weights)
+    return names, national_ids, phones, weights
+
+
+def iter_rows(file_path, stats=None):
+    """Yield raw value tuples from file_path using the reader registered for its format"""
+    stats = stats if stats is not None else LoadStats()
+    return get_reader(file_path)(file_path, stats)
+
+
+def iter_chunks(file_path, stats=None, progress=None, cancel_event=None, rows=None, weights=None):
+    """Yield valid participants as normalized column chunks, see normalize_chunk
+
+    Chunks hold up to NORMALIZE_CHUNK rows. progress is called with the stats
+    every PROGRESS_EVERY rows, and the read stops with LoadCancelled as soon
+    as cancel_event is set. rows overrides the reader picked for file_path.
+    weights says whether the fourth column holds ticket counts; None decides
+    by its header in the first row. Rows with an invalid count are left out
+    and counted in the stats.
+    """
+    stats = stats if stats is not None else LoadStats()
+    start = time.perf_counter()
+    chunk = []
+    if rows is None:
+        rows = iter_rows(file_path, stats)
+    weight_column = weights
+    try:
+        for row in rows:
+            if weight_column is None:
+                weight_column = len(row) > 3 and is_weight_header(row[3])
+            stats.rows += 1
+            if stats.rows % PROGRESS_EVERY == 0:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise LoadCancelled(file_path)
+                if progress is not None:
+                    stats.elapsed = time.perf_counter() - start
+                    progress(stats)
+            entry = parse_row(row, weight_column)
+            if entry is not None and entry[3] is None:
+                # Header rows of later sheets have no digits in the ID and are not reported
+                if any(map(str.isdigit, entry[1])):
+                    stats.add_invalid_weight(stats.rows, row[3])
+                continue
+            if entry is not None:
+                chunk.append(entry)
+                if len(chunk) >= NORMALIZE_CHUNK:
+                    columns = normalize_chunk(chunk)
+                    stats.entries += len(columns[0])
+                    yield columns
+                    chunk = []
+        if chunk:
+            columns = normalize_chunk(chunk)
+            stats.entries += len(columns[0])
+            yield columns
+    finally:
+        if weight_column is not None:
+            stats.weight_column = weight_column
+        stats.elapsed = time.perf_counter() - start
+
+
+def parse_sheet(file_path, sheet_name, weights):
+    """Process pool worker: parse one workbook sheet, returns (store, stats)"""
+    stats = LoadStats()
+    store = ParticipantStore()
+    rows = read_xlsx(file_path, stats, [sheet_name])
+    for columns in iter_chunks(file_path, stats, rows=rows, weights=weights):
+        store.extend_columns(*columns)
+    return store, stats
+
+
+def load_sheets_parallel(file_path, sheet_names, workers, stats, progress=None, cancel_event=None, weights=None):
+    """Parse sheets in a process pool and merge them in workbook order
+
+    The merge waits for the sheets in order, so the result is the same as
+    reading the sheets one after another. Every sheet is parsed with the
+    weight column decision of the first one.
+    """
+    if weights is None:
+        first_row = xlsx_first_row(file_path)
+        weights = len(first_row) > 3 and is_weight_header(first_row[3])
+    stats.weight_column = weights
+    start = time.perf_counter()
+    entries = ParticipantStore()
+    from multiprocessing import get_context
+
+    # Spawned, not forked: the loader runs on a thread of the Tk process
+    executor = futures.ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"))
+    cancelled = False
+    try:
+        pending = [executor.submit(parse_sheet, file_path, name, weights) for name in sheet_names]
+        for future in pending:
+            while True:
+                try:
+                    store, sheet_stats = future.result(timeout=0.2)
+                    break
+                except futures.TimeoutError:
+                    if cancel_event is not None and cancel_event.is_set():
+                        cancelled = True
+                        raise LoadCancelled(file_path)
+            entries.extend_store(store)
+            for row_number, value in sheet_stats.invalid_weight_examples:
+                stats.add_invalid_weight(stats.rows + row_number, value)
+            # Only the first few were listed, the rest still count
+            stats.invalid_weights += sheet_stats.invalid_weights - len(sheet_stats.invalid_weight_examples)
+            stats.rows += sheet_stats.rows
+            stats.entries += sheet_stats.entries
+            stats.elapsed = time.perf_counter() - start
+            if progress is not None:
+                progress(stats)
+    finally:
+        # Sheets already being parsed cannot be interrupted, don't wait for them
+        executor.shutdown(wait=not cancelled, cancel_futures=True)
+        stats.elapsed = time.perf_counter() - start
+    return entries
+
+
+def load_participants(file_path, progress=None, cancel_event=None, cache_dir=DEFAULT_CACHE_DIR,
+                      workers=1, dedup=DEFAULT_POLICY, weights=None):
+    """Read every valid participant from file_path, returns (store, stats)
+
+    The entries come back as a ParticipantStore, with per-entry ticket
+    counts in its weights when the file has a weight column: a fourth column
+    whose header names tickets, or any fourth column when weights is True
+    (False ignores it). Rows with an invalid ticket count are left out and
+    reported in the stats. dedup is a duplicate policy
+    from dedup.POLICIES (or None to keep every row); its report ends up in
+    stats.duplicates. When cache_dir is set, an unchanged file is mapped from
+    its snapshot instead of being parsed, and a parsed file gets a new
+    snapshot. With workers above 1, workbooks with several sheets are parsed
+    by up to that many processes. This is opt-in: every worker parses the
+    whole shared strings table again, and the speedup has not been measured
+    on a multi-core machine yet (bench.py sheets). Nothing is returned for a cancelled
+    load, so callers never see a partial list.
+    """
+    stats = LoadStats()
+    variant = f"dedup={dedup}|weights={weights}"
+    if cache_dir:
+        start = time.perf_counter()
+        cached = load_snapshot(file_path, cache_dir, variant)
+        if cached is not None:
+            entries, header = cached
+            stats.rows = stats.entries = stats.total_rows = len(entries)
+            extra = header["extra"]
+            stats.set_weight_report(extra["weights"])
+            if extra["duplicates"]:
+                stats.duplicates = DuplicateReport.from_dict(extra["duplicates"])
+                counts = header["extra_columns"].get("duplicate_counts")
+                if counts is not None:
+                    stats.duplicates.attach(entries, counts)
+                stats.rows = stats.entries = stats.total_rows = stats.duplicates.rows
+            stats.sha256 = header["source"]["sha256"]
+            stats.elapsed = time.perf_counter() - start
+            stats.from_cache = True
+            print(f"Loaded {file_path} from snapshot: {stats}")
+            return entries, stats
+
+    deduplicator = Deduplicator(dedup) if dedup else None
+    sheets = []
+    if os.path.splitext(file_path)[1].lower() in XLSX_EXTENSIONS:
+        sheets = xlsx_sheet_sizes(file_path)
+    workers = min(len(sheets), workers)
+    # A single sheet is read in this process, the pool only pays off for several
+    if len(sheets) > 1 and workers > 1:
+        sizes = [size for _, size in sheets]
+        stats.total_rows = None if None in sizes else sum(sizes)
+        entries = load_sheets_parallel(
+            file_path, [name for name, _ in sheets], workers, stats, progress, cancel_event, weights
+        )
+        if deduplicator is not None:
+            # Duplicates can span sheets, so this pass runs on the merged store
+            deduplicator.reserve(len(entries))
+            deduplicator.add((entries.national_id(i) for i in range(len(entries))), entries.weights)
+    else:
+        entries = ParticipantStore()
+        chunks = iter_chunks(file_path, stats, progress, cancel_event, weights=weights)
+        for names, national_ids, phones, chunk_weights in chunks:
+            entries.extend_columns(names, national_ids, phones, chunk_weights)
+            if deduplicator is not None:
+                # The row count is known once the file is open, after that this is a no-op
+                deduplicator.reserve(stats.total_rows or len(entries))
+                deduplicator.add(national_ids, chunk_weights)
+
+    if deduplicator is not None:
+        entries = deduplicator.apply(entries)
+        stats.duplicates = deduplicator.report
+        print(f"Duplicates in {file_path}: {stats.duplicates}")
+    if stats.invalid_weights:
+        print(f"Rows with an invalid ticket count in {file_path}: {stats.invalid_weights}, "
+              f"e.g. {stats.invalid_weight_examples}")
+    stats.sha256 = file_sha256(file_path)
+    print(f"Loaded {file_path}: {stats}")
+    if cache_dir:
+        try:
+            extra = {"duplicates": None, "weights": stats.weight_report()}
+            extra_columns = None
+            if stats.duplicates is not None:
+                extra["duplicates"] = stats.duplicates.to_dict()
+                extra_columns = {"duplicate_counts": stats.duplicates.counts}
+            write_snapshot(entries, file_path, cache_dir, variant, stats.sha256, extra, extra_columns)
+        except OSError as e:
+            print(f"Could not write participant snapshot: {e}")
+    return entries, stats
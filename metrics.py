@@ -0,0 +1,159 @@
+"""Timing spans, counters and an on-demand profiler
+
+Every major operation of the app runs inside a METRICS.span(name) and
+bumps counters, so a slow session can be traced to loading, past-winner
+matching, drawing, building the winner cards or saving. The numbers are
+written as JSON or in the Prometheus text format, for comparing machines
+and releases:
+
+    METRICS.write("metrics.json")
+    METRICS.write("metrics.prom")
+
+Recording is a perf_counter call and a dict update per span, cheap enough
+to stay on all the time. Profiler adds cProfile and tracemalloc capture
+for a stretch of a session and is only imported when switched on.
+"""
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+PROMETHEUS_EXTENSIONS = (".prom", ".txt")
+PROFILE_TOP = 30
+
+
+class Metrics:
+    """Thread-safe span timings and counters of one process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = datetime.now()
+        # name -> [count, total seconds, max seconds, last seconds]
+        self.spans = {}
+        self.counters = {}
+
+    @contextmanager
+    def span(self, name):
+        """Time the with block under name, also when it raises"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds):
+        with self._lock:
+            stats = self.spans.setdefault(name, [0, 0.0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+            stats[3] = seconds
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def snapshot(self):
+        with self._lock:
+            spans = {
+                name: {"count": count, "total_seconds": total, "max_seconds": longest, "last_seconds": last}
+                for name, (count, total, longest, last) in sorted(self.spans.items())
+            }
+            counters = dict(sorted(self.counters.items()))
+        return {
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "uptime_seconds": (datetime.now() - self.started_at).total_seconds(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "spans": spans,
+            "counters": counters,
+        }
+
+    def to_prometheus(self):
+        snapshot = self.snapshot()
+        info = f'python="{snapshot["python"]}",platform="{snapshot["platform"]}"'
+        lines = [
+            "# TYPE lottery_info gauge",
+            f"lottery_info{{{info}}} 1",
+            "# TYPE lottery_uptime_seconds gauge",
+            f"lottery_uptime_seconds {snapshot['uptime_seconds']:.3f}",
+            "# TYPE lottery_span_seconds summary",
+        ]
+        for name, stats in snapshot["spans"].items():
+            lines.append(f'lottery_span_seconds_sum{{span="{name}"}} {stats["total_seconds"]:.6f}')
+            lines.append(f'lottery_span_seconds_count{{span="{name}"}} {stats["count"]}')
+        lines.append("# TYPE lottery_span_max_seconds gauge")
+        for name, stats in snapshot["spans"].items():
+            lines.append(f'lottery_span_max_seconds{{span="{name}"}} {stats["max_seconds"]:.6f}')
+        for name, value in snapshot["counters"].items():
+            lines.append(f"# TYPE lottery_{name}_total counter")
+            lines.append(f"lottery_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Write the metrics to path, Prometheus text for .prom/.txt, JSON otherwise"""
+        if os.path.splitext(path)[1].lower() in PROMETHEUS_EXTENSIONS:
+            text = self.to_prometheus()
+        else:
+            text = json.dumps(self.snapshot(), ensure_ascii=False, indent=2) + "\n"
+        partial = path + ".partial"
+        with open(partial, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(partial, path)
+
+
+# Shared by the app, the loader thread and the command line
+METRICS = Metrics()
+
+
+class Profiler:
+    """cProfile and tracemalloc capture between start() and stop()
+
+    cProfile only sees the thread that started it, the Tk thread in the app;
+    work on loader or export threads shows up in the spans instead.
+    """
+
+    def __init__(self, out_dir="profiles"):
+        self.out_dir = out_dir
+        self._profile = None
+
+    @property
+    def running(self):
+        return self._profile is not None
+
+    def start(self):
+        import cProfile
+        import tracemalloc
+
+        profile = cProfile.Profile()
+        profile.enable()
+        self._profile = profile
+        tracemalloc.start()
+
+    def stop(self):
+        """Stop capturing, returns the (.prof, summary .txt) paths written"""
+        import io
+        import pstats
+        import tracemalloc
+
+        self._profile.disable()
+        memory = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        profile, self._profile = self._profile, None
+
+        os.makedirs(self.out_dir, exist_ok=True)
+        base = os.path.join(self.out_dir, f"{datetime.now():%Y%m%d-%H%M%S}")
+        profile.dump_stats(base + ".prof")
+        summary = io.StringIO()
+        pstats.Stats(profile, stream=summary).sort_stats("cumulative").print_stats(PROFILE_TOP)
+        summary.write(f"\nPython memory: {current / 2**20:.1f} MB now, {peak / 2**20:.1f} MB peak\n")
+        for stat in memory.statistics("lineno")[:PROFILE_TOP]:
+            summary.write(f"{stat}\n")
+        with open(base + ".txt", "w", encoding="utf-8") as f:
+            f.write(summary.getvalue())
+        return base + ".prof", base + ".txt"
@@ -0,0 +1,29 @@
+"""National ID normalization"""
+import re
+
+from phones import DIGIT_TRANSLATION, SEPARATOR
+
+NATIONAL_ID_LENGTH = 10
+SEPARATOR_CHARS = re.compile(r"[\s\-_./]")
+
+
+def pad_national_id(national_id):
+    # Numeric cells lose their leading zeros in Excel
+    if national_id.isascii() and national_id.isdigit() and len(national_id) < NATIONAL_ID_LENGTH:
+        return national_id.zfill(NATIONAL_ID_LENGTH)
+    return national_id
+
+
+def normalize_national_id(national_id):
+    """ASCII digits without separators, zero-padded to 10 digits when numeric"""
+    cleaned = SEPARATOR_CHARS.sub("", str(national_id).strip().translate(DIGIT_TRANSLATION))
+    return pad_national_id(cleaned)
+
+
+def normalize_national_id_column(national_ids):
+    """normalize_national_id for a whole column, with one regex pass over the joined column"""
+    national_ids = [str(national_id).strip() for national_id in national_ids]
+    if not national_ids:
+        return []
+    joined = SEPARATOR_CHARS.sub("", SEPARATOR.join(national_ids).translate(DIGIT_TRANSLATION))
+    return [pad_national_id(national_id) for national_id in joined.split(SEPARATOR)]
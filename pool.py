@@ -0,0 +1,170 @@
+"""Pool of participants who are still eligible to win"""
+import random
+from array import array
+from bisect import bisect_right
+from itertools import accumulate, compress
+from operator import mul
+
+
+class ParticipantPool:
+    """Eligible participants of an entry sequence, keyed by national ID
+
+    Eligibility is one flag byte per entry, so building a pool for millions
+    of entries is a single allocation and eligibility checks and removals
+    are O(1). entries can be a list of tuples or a ParticipantStore.
+
+    Sampling draws tickets over all entries, one per entry or the entry's
+    weight (ticket count) when entries carry weights, so everyone remaining
+    is picked with probability proportional to their tickets. A weighted
+    ticket is looked up by binary search in the cumulative weights. Tickets
+    of removed entries are rejected and redrawn; once most tickets would be
+    rejected, a table of the remaining entries is used instead.
+    """
+
+    def __init__(self, entries=(), excluded_ids=()):
+        self.entries = entries
+        self._alive = bytearray(b"\x01") * len(entries)
+        self._count = len(entries)
+        self._by_id = None
+        self.weights = getattr(entries, "weights", None)
+        self._cumulative = None
+        # (removal count, table) of the last table without removed entries
+        self._masked = None
+        self._removed_count = 0
+        # Tickets of all removed entries
+        self._removed_total = 0
+        excluded_ids = set(excluded_ids)
+        if excluded_ids:
+            national_id = self._national_id_getter()
+            self.remove_indices(i for i in range(len(entries)) if national_id(i) in excluded_ids)
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, national_id):
+        i = self.index_of(national_id)
+        return i is not None and self._alive[i] == 1
+
+    def __iter__(self):
+        for i in compress(range(len(self._alive)), self._alive):
+            yield self.entries[i]
+
+    def _national_id_getter(self):
+        if hasattr(self.entries, "national_id"):
+            return self.entries.national_id
+        return lambda i: self.entries[i][1]
+
+    def index_of(self, national_id):
+        """Entry index of national_id, or None"""
+        if self._by_id is None:
+            # Only built on the first lookup by ID, draws work on indices
+            national_id_of = self._national_id_getter()
+            self._by_id = {}
+            for i in range(len(self.entries)):
+                self._by_id.setdefault(national_id_of(i), i)
+        return self._by_id.get(national_id)
+
+    def remove_index(self, i):
+        """Remove the entry at index i of entries, returns False if it was not eligible"""
+        if not self._alive[i]:
+            return False
+        self._alive[i] = 0
+        self._count -= 1
+        self._removed_count += 1
+        self._removed_total += 1 if self.weights is None else self.weights[i]
+        return True
+
+    def remove_indices(self, indices):
+        """Remove many entries by index, e.g. past winners, returns how many were eligible"""
+        alive = self._alive
+        weights = self.weights
+        removed = tickets = 0
+        for i in indices:
+            if alive[i]:
+                alive[i] = 0
+                removed += 1
+                if weights is not None:
+                    tickets += weights[i]
+        self._count -= removed
+        self._removed_count += removed
+        self._removed_total += removed if weights is None else tickets
+        return removed
+
+    def remove(self, national_id):
+        """Remove a participant by national ID, returns the removed entry or None"""
+        i = self.index_of(national_id)
+        if i is None or not self.remove_index(i):
+            return None
+        return self.entries[i]
+
+    def remove_many(self, entries):
+        for entry in entries:
+            self.remove(entry[1])
+
+    def _plain_table(self):
+        """(tickets, ticket -> entry index) over all entries, removed ones included
+
+        The table never changes, so it is built once: ticket t is entry t for
+        unweighted pools, or found in the cumulative weights otherwise.
+        """
+        if self.weights is None:
+            return len(self.entries), None
+        if self._cumulative is None:
+            self._cumulative = array('Q', accumulate(self.weights))
+        cumulative = self._cumulative
+        return cumulative[-1], lambda ticket: bisect_right(cumulative, ticket)
+
+    def _masked_table(self, picked=()):
+        """(tickets, ticket -> entry index) without removed entries and picked"""
+        if not picked and self._masked is not None and self._masked[0] == self._removed_count:
+            return self._masked[1]
+        alive = self._alive
+        if picked:
+            alive = bytearray(alive)
+            for i in picked:
+                alive[i] = 0
+        if self.weights is None:
+            eligible = array('i', compress(range(len(alive)), alive))
+            table = len(eligible), eligible.__getitem__
+        else:
+            cumulative = array('Q', accumulate(map(mul, self.weights, alive)))
+            table = cumulative[-1], lambda ticket: bisect_right(cumulative, ticket)
+        if not picked:
+            self._masked = (self._removed_count, table)
+        return table
+
+    def sample_indices(self, k, rng=random):
+        """Pick k distinct eligible entry indices without removing them
+
+        Tickets are drawn one at a time, which gives the same distribution as
+        drawing winners one after another. The result only depends on the
+        entries, which of them are still eligible and the random stream, not
+        on the order of earlier removals, so a seeded draw can be replayed on
+        a fresh pool (see audit.py).
+        """
+        if not 0 <= k <= self._count:
+            raise ValueError("sample larger than population")
+        total, pick = self._plain_table()
+        # Tickets that would be rejected: removed entries, then picked ones too
+        rejected = self._removed_total
+        alive = self._alive
+        weights = self.weights
+        picked = []
+        seen = set()
+        while len(picked) < k:
+            if rejected and rejected * 2 > total:
+                # Most tickets are taken: continue on a table without them
+                total, pick = self._masked_table(picked)
+                rejected = 0
+            ticket = rng.randrange(total)
+            i = ticket if pick is None else pick(ticket)
+            if not alive[i] or i in seen:
+                continue
+            seen.add(i)
+            picked.append(i)
+            rejected += 1 if weights is None else weights[i]
+        return picked
+
+    def sample(self, k, rng=random):
+        """Pick k distinct eligible entries without removing them"""
+        return [self.entries[i] for i in self.sample_indices(k, rng)]
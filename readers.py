@@ -0,0 +1,249 @@
+"""Participant file readers, picked by file extension or content sniffing
+
+A reader is a generator function taking (file_path, stats) and yielding raw
+row tuples; it may set stats.total_rows when the format knows its row count.
+Readers for optional formats import their library lazily so a missing
+package only matters when such a file is opened.
+"""
+import csv
+import os
+import posixpath
+import re
+import zipfile
+from xml.etree import ElementTree
+
+READERS = {}
+SNIFF_BYTES = 8
+CSV_SAMPLE_BYTES = 64 * 1024
+PARQUET_BATCH_ROWS = 64 * 1024
+# The dimension record comes right after the sheet properties
+SHEET_HEAD_BYTES = 16 * 1024
+SHEET_DIMENSION = re.compile(rb'<(?:\w+:)?dimension ref="(?:[A-Z]+[0-9]+:)?[A-Z]+([0-9]+)"')
+
+
+class UnsupportedFormat(Exception):
+    """Raised when no reader can handle a file"""
+
+
+def register_reader(*extensions):
+    """Register the decorated reader for the given lowercase extensions"""
+    def decorator(reader):
+        for extension in extensions:
+            READERS[extension] = reader
+        return reader
+    return decorator
+
+
+def sniff_extension(file_path):
+    """Guess the format of a file from its first bytes"""
+    with open(file_path, "rb") as f:
+        head = f.read(SNIFF_BYTES)
+    if head.startswith(b"PK\x03\x04"):
+        return ".xlsx"
+    if head.startswith(b"\xd0\xcf\x11\xe0"):
+        return ".xls"
+    if head.startswith(b"PAR1"):
+        return ".parquet"
+    return ".csv"
+
+
+def get_reader(file_path):
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension not in READERS:
+        extension = sniff_extension(file_path)
+    return READERS[extension]
+
+
+def supported_patterns():
+    """File dialog pattern for every registered extension"""
+    return " ".join(f"*{extension}" for extension in sorted(READERS))
+
+
+XLSX_EXTENSIONS = (".xlsx", ".xlsm")
+
+
+def local_name(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def xlsx_sheet_parts(archive):
+    """(sheet name, zip part or None) for every worksheet of an open xlsx archive, in workbook order
+
+    Chart sheets are left out, like openpyxl's Workbook.worksheets does.
+    """
+    workbook = ElementTree.fromstring(archive.read("xl/workbook.xml"))
+    relations = ElementTree.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+    targets = {relation.get("Id"): relation.get("Target") for relation in relations}
+    chart_sheets = {relation.get("Id") for relation in relations
+                    if relation.get("Type", "").endswith("/chartsheet")}
+    parts = []
+    for sheet in workbook.iter():
+        if local_name(sheet.tag) != "sheet":
+            continue
+        relation_id = next((value for key, value in sheet.attrib.items() if local_name(key) == "id"), None)
+        if relation_id in chart_sheets:
+            continue
+        target = targets.get(relation_id)
+        part = None
+        if target is not None:
+            # Targets are relative to xl/ unless they start with a slash
+            part = target.lstrip("/") if target.startswith("/") else posixpath.join("xl", target)
+            part = posixpath.normpath(part)
+        parts.append((sheet.get("name"), part))
+    return parts
+
+
+def xlsx_sheet_sizes(file_path):
+    """(sheet name, row count) for every worksheet, in workbook order
+
+    Read straight from the zip: opening the workbook with openpyxl would
+    parse its whole shared strings table, seconds for large files. Row
+    counts come from each sheet's dimension record and may be None in
+    hand-made files.
+    """
+    with zipfile.ZipFile(file_path) as archive:
+        sizes = []
+        for name, part in xlsx_sheet_parts(archive):
+            rows = None
+            if part is not None:
+                try:
+                    with archive.open(part) as f:
+                        match = SHEET_DIMENSION.search(f.read(SHEET_HEAD_BYTES))
+                    rows = int(match.group(1)) if match else None
+                except KeyError:
+                    pass
+            sizes.append((name, rows))
+    return sizes
+
+
+def column_index(reference):
+    """0-based column of a cell reference such as D1"""
+    index = 0
+    for char in reference:
+        if not char.isalpha():
+            break
+        index = index * 26 + ord(char.upper()) - ord("A") + 1
+    return index - 1
+
+
+def xlsx_first_row(file_path):
+    """Text of the first row of the first sheet, read from the zip like xlsx_sheet_sizes
+
+    Only the shared strings up to the last one the row uses are parsed.
+    """
+    with zipfile.ZipFile(file_path) as archive:
+        parts = [part for _, part in xlsx_sheet_parts(archive) if part is not None]
+        if not parts:
+            return []
+        cells = {}
+        with archive.open(parts[0]) as f:
+            for _, element in ElementTree.iterparse(f):
+                tag = local_name(element.tag)
+                if tag == "c":
+                    kind = element.get("t")
+                    if kind == "inlineStr":
+                        value = "".join(node.text or "" for node in element.iter() if local_name(node.tag) == "t")
+                    else:
+                        value = next((node.text or "" for node in element if local_name(node.tag) == "v"), "")
+                    reference = element.get("r")
+                    index = column_index(reference) if reference else len(cells)
+                    cells[index] = (kind, value)
+                elif tag == "row":
+                    # Rows before the first stored one are empty
+                    if element.get("r", "1") != "1":
+                        cells = {}
+                    break
+        shared = sorted(int(value) for kind, value in cells.values() if kind == "s" and value.isdigit())
+        strings = []
+        if shared and "xl/sharedStrings.xml" in archive.namelist():
+            with archive.open("xl/sharedStrings.xml") as f:
+                for _, element in ElementTree.iterparse(f):
+                    if local_name(element.tag) == "si":
+                        strings.append("".join(node.text or "" for node in element.iter()
+                                               if local_name(node.tag) == "t"))
+                        element.clear()
+                        if len(strings) > shared[-1]:
+                            break
+    row = [""] * (max(cells) + 1 if cells else 0)
+    for index, (kind, value) in cells.items():
+        if kind == "s":
+            value = strings[int(value)] if value.isdigit() and int(value) < len(strings) else ""
+        row[index] = value
+    return row
+
+
+@register_reader(*XLSX_EXTENSIONS)
+def read_xlsx(file_path, stats, sheet_names=None):
+    """Stream sheets without loading the workbook into memory
+
+    Reads every sheet in workbook order (regional campaigns keep one sheet
+    per region) unless sheet_names picks some of them.
+    """
+    from openpyxl import load_workbook
+
+    # read_only streams the sheet XML instead of building every cell object up front
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheets = [wb[name] for name in sheet_names] if sheet_names else wb.worksheets
+        sizes = [sheet.max_row for sheet in sheets]
+        stats.total_rows = None if None in sizes else sum(sizes)
+        for sheet in sheets:
+            for row in sheet.iter_rows(min_row=1, values_only=True):
+                yield row
+    finally:
+        wb.close()
+
+
+@register_reader(".xls")
+def read_xls(file_path, stats):
+    """Legacy Excel 97-2003 workbooks, needs the xlrd package"""
+    try:
+        import xlrd
+    except ImportError:
+        raise UnsupportedFormat("خواندن فایل‌های xls به بسته xlrd نیاز دارد (pip install xlrd)")
+
+    book = xlrd.open_workbook(file_path, on_demand=True)
+    try:
+        sheet = book.sheet_by_index(0)
+        stats.total_rows = sheet.nrows
+        for i in range(sheet.nrows):
+            yield tuple(sheet.row_values(i))
+    finally:
+        book.release_resources()
+
+
+def read_delimited(file_path, stats, delimiter=None):
+    with open(file_path, newline="", encoding="utf-8-sig") as f:
+        if delimiter is None:
+            sample = f.read(CSV_SAMPLE_BYTES)
+            f.seek(0)
+            try:
+                delimiter = csv.Sniffer().sniff(sample, delimiters=",;\t|").delimiter
+            except csv.Error:
+                delimiter = ","
+        # csv.reader is implemented in C, so this is the fastest path we have
+        yield from csv.reader(f, delimiter=delimiter)
+
+
+@register_reader(".csv", ".txt")
+def read_csv(file_path, stats):
+    return read_delimited(file_path, stats)
+
+
+@register_reader(".tsv")
+def read_tsv(file_path, stats):
+    return read_delimited(file_path, stats, "\t")
+
+
+@register_reader(".parquet", ".pq")
+def read_parquet(file_path, stats):
+    """Parquet files read in record batches, needs the pyarrow package"""
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise UnsupportedFormat("خواندن فایل‌های Parquet به بسته pyarrow نیاز دارد (pip install pyarrow)")
+
+    parquet_file = pq.ParquetFile(file_path)
+    stats.total_rows = parquet_file.metadata.num_rows
+    for batch in parquet_file.iter_batches(batch_size=PARQUET_BATCH_ROWS):
+        yield from zip(*(column.to_pylist() for column in batch.columns))
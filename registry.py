@@ -0,0 +1,165 @@
+"""Persistent registry of everyone who has already won"""
+import os
+import sqlite3
+from datetime import datetime
+
+from national_ids import normalize_national_id
+from phones import DIGIT_TRANSLATION
+from results import TIMESTAMP_FORMAT
+from store import DigitColumn
+
+# SQLite integers are signed 64-bit, larger keys are only kept as text
+MAX_SQLITE_KEY = 2**63 - 1
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS winners (
+    national_id TEXT PRIMARY KEY,
+    id_key INTEGER,
+    name TEXT NOT NULL,
+    masked_phone TEXT NOT NULL,
+    drawn_at TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS winners_name ON winners (name);
+CREATE INDEX IF NOT EXISTS winners_masked_phone ON winners (masked_phone);
+CREATE INDEX IF NOT EXISTS winners_drawn_at ON winners (drawn_at);
+"""
+# Sorts after every character a name can continue with, for prefix ranges
+PREFIX_END = "\U0010ffff"
+
+
+def sqlite_key(national_id):
+    key = DigitColumn.key(national_id)
+    return key if key is not None and key <= MAX_SQLITE_KEY else None
+
+
+class WinnerRegistry:
+    """SQLite table of past winners keyed by national ID
+
+    Opening the registry reads nothing, so startup does not depend on how
+    many people have won. Excluding past winners from a loaded file reads the
+    packed ID keys once into a set and matches them against the store's
+    packed national ID column, O(1) per entry. A connection is opened per
+    call so the registry can be used from the loader thread as well.
+    """
+
+    def __init__(self, path="winners.db", journal=None):
+        self.path = path
+        created = not os.path.exists(path)
+        db = self.connect()
+        try:
+            db.executescript(SCHEMA)
+        finally:
+            db.close()
+        if created and journal is not None:
+            # First run with a registry: winners of earlier sessions come from the journal
+            self.add_rows((row[1], row[2], row[3], row[4]) for row in journal.iter_rows() if len(row) >= 5)
+
+    def connect(self):
+        db = sqlite3.connect(self.path)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    def add_rows(self, rows):
+        """Record (name, national_id, masked_phone, drawn_at) rows, keeping the first win of a person"""
+        def records():
+            for name, national_id, masked_phone, drawn_at in rows:
+                national_id = normalize_national_id(national_id)
+                yield national_id, sqlite_key(national_id), name, masked_phone, drawn_at
+
+        db = self.connect()
+        try:
+            with db:
+                db.executemany("INSERT OR IGNORE INTO winners VALUES (?, ?, ?, ?, ?)", records())
+        finally:
+            db.close()
+
+    def add(self, winners, drawn_at=None):
+        """Record one draw, winners are participant entries from the loader"""
+        timestamp = (drawn_at or datetime.now()).strftime(TIMESTAMP_FORMAT)
+        self.add_rows((name, national_id, masked_phone, timestamp)
+                      for name, national_id, _, masked_phone in winners)
+
+    def __len__(self):
+        db = self.connect()
+        try:
+            return db.execute("SELECT COUNT(*) FROM winners").fetchone()[0]
+        finally:
+            db.close()
+
+    def __contains__(self, national_id):
+        db = self.connect()
+        try:
+            row = db.execute("SELECT 1 FROM winners WHERE national_id = ?",
+                             (normalize_national_id(national_id),)).fetchone()
+        finally:
+            db.close()
+        return row is not None
+
+    def id_sets(self):
+        """(packed keys, other IDs) of every past winner, see DigitColumn.key"""
+        db = self.connect()
+        try:
+            keys = {key for (key,) in db.execute("SELECT id_key FROM winners WHERE id_key IS NOT NULL")}
+            texts = set()
+            for (national_id,) in db.execute("SELECT national_id FROM winners WHERE id_key IS NULL"):
+                key = DigitColumn.key(national_id)
+                if key is None:
+                    texts.add(national_id)
+                else:
+                    keys.add(key)
+        finally:
+            db.close()
+        return keys, texts
+
+    def winner_indices(self, entries):
+        """Indices of the entries whose person has already won"""
+        keys, texts = self.id_sets()
+        if not keys and not texts:
+            return []
+        if hasattr(entries, "national_id_indices"):
+            return entries.national_id_indices(keys, texts)
+        return [i for i, entry in enumerate(entries)
+                if entry[1] in texts or DigitColumn.key(entry[1]) in keys]
+
+    def search(self, query="", offset=0, limit=50):
+        """One page of past winners matching query, returns (total matches, rows)
+
+        Rows are (name, national_id, masked_phone, drawn_at). A query with
+        "*" is matched exactly against masked phones, an all-digit query
+        (Persian digits too) exactly against national IDs, anything else as a
+        name prefix; an empty query lists every winner, newest first. Each
+        case is a range or equality lookup on an index, so a page takes
+        milliseconds however many winners there are.
+        """
+        query = query.strip()
+        digits = query.translate(DIGIT_TRANSLATION)
+        if not query:
+            # Matches the drawn_at index, which also holds the national ID
+            where, args, order = "", (), "drawn_at DESC, national_id DESC"
+        elif "*" in query:
+            where, args, order = "WHERE masked_phone = ?", (digits,), "drawn_at DESC"
+        elif digits.isdigit():
+            where, args, order = "WHERE national_id = ?", (normalize_national_id(digits),), "drawn_at DESC"
+        else:
+            where, args, order = "WHERE name >= ? AND name < ?", (query, query + PREFIX_END), "name"
+        db = self.connect()
+        try:
+            total = db.execute(f"SELECT COUNT(*) FROM winners {where}", args).fetchone()[0]
+            # The page is located on the index alone, only its rows are read from the table
+            rows = db.execute(
+                f"SELECT name, national_id, masked_phone, drawn_at FROM ("
+                f"SELECT national_id FROM winners {where} ORDER BY {order} LIMIT ? OFFSET ?"
+                f") JOIN winners USING (national_id) ORDER BY {order}",
+                args + (limit, offset)
+            ).fetchall()
+        finally:
+            db.close()
+        return total, rows
+
+    def clear(self):
+        db = self.connect()
+        try:
+            with db:
+                db.execute("DELETE FROM winners")
+        finally:
+            db.close()
@@ -0,0 +1,85 @@
+"""Winner results persistence: an append-only journal plus Excel export"""
+import csv
+import os
+from datetime import datetime
+
+HEADER = ["ردیف", "نام", "کد ملی", "شماره موبایل (مخفی)", "تاریخ قرعه‌کشی",
+          "شناسه قرعه‌کشی", "بذر (seed)", "هش فایل شرکت‌کنندگان"]
+COLUMN_WIDTHS = {'A': 10, 'B': 30, 'C': 20, 'D': 20, 'E': 20, 'F': 25, 'G': 66, 'H': 66}
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class ResultsJournal:
+    """Append-only CSV log of drawn winners
+
+    Each draw only appends its own rows, so saving costs O(new winners) no
+    matter how long the history is. The journal is turned into an .xlsx file
+    on demand with export_xlsx.
+    """
+
+    def __init__(self, path="winners.csv", legacy_xlsx="winners.xlsx"):
+        self.path = path
+        if not os.path.exists(self.path):
+            with open(self.path, "w", newline="", encoding="utf-8-sig") as f:
+                csv.writer(f).writerow(HEADER)
+            if legacy_xlsx and os.path.exists(legacy_xlsx):
+                self.import_xlsx(legacy_xlsx)
+
+    def append_rows(self, rows):
+        with open(self.path, "a", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerows(rows)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def append(self, winners, drawn_at=None, audit=()):
+        """Record one draw, winners are participant entries from the loader
+
+        audit holds the draw ID, seed and participant file hash of an
+        audited draw (see audit.py), repeated on every row of the draw.
+        """
+        timestamp = (drawn_at or datetime.now()).strftime(TIMESTAMP_FORMAT)
+        audit = list(audit)
+        self.append_rows(
+            [i, name, national_id, masked_phone, timestamp] + audit
+            for i, (name, national_id, _, masked_phone) in enumerate(winners, start=1)
+        )
+
+    def iter_rows(self):
+        """Yield journal rows without the header"""
+        with open(self.path, newline="", encoding="utf-8-sig") as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            yield from reader
+
+    def import_xlsx(self, path):
+        """Copy the rows of a winners.xlsx written by older versions into the journal"""
+        from openpyxl import load_workbook
+
+        wb = load_workbook(path, read_only=True)
+        try:
+            rows = wb.active.iter_rows(min_row=2, values_only=True)
+            self.append_rows(["" if v is None else v for v in row[:len(HEADER)]] for row in rows)
+        finally:
+            wb.close()
+
+    def export_xlsx(self, path="winners.xlsx"):
+        """Write the whole journal to an Excel file, streaming rows with write-only mode"""
+        write_xlsx(path, (
+            [int(row[0]) if row[0].isdigit() else row[0]] + row[1:]
+            for row in self.iter_rows()
+        ))
+
+
+def write_xlsx(path, rows):
+    """Stream rows under the standard winners header into a new .xlsx file"""
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Winners")
+    # Column widths must be set before the first row in write-only mode
+    for column, width in COLUMN_WIDTHS.items():
+        ws.column_dimensions[column].width = width
+    ws.append(HEADER)
+    for row in rows:
+        ws.append(row)
+    wb.save(path)
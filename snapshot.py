@@ -0,0 +1,166 @@
+"""Binary snapshots of parsed participant files
+
+A snapshot stores the columns of a ParticipantStore exactly as they are laid
+out in memory, so reopening the same participant file maps the snapshot with
+mmap instead of parsing the spreadsheet again.
+
+File layout: MAGIC, an 8-byte header length, a JSON header and then the raw
+column buffers, each starting on an 8-byte boundary.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+
+from store import DigitColumn, ParticipantStore
+
+MAGIC = b"LOTSNAP1"
+# Also bumped when parsing changes, so snapshots of wrongly parsed files are rebuilt
+VERSION = 9
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".lottery_cache", "participants")
+COLUMN_FORMATS = {
+    "names": "B",
+    "name_offsets": "Q",
+    "national_id_values": "Q",
+    "national_id_lengths": "B",
+    "phone_values": "Q",
+    "phone_lengths": "B",
+    "weights": "I",
+    # Rows per kept person, for the full duplicate report
+    "duplicate_counts": "I",
+}
+STORE_COLUMNS = ("names", "name_offsets", "national_id_values", "national_id_lengths",
+                 "phone_values", "phone_lengths", "weights")
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def snapshot_path(source, cache_dir=DEFAULT_CACHE_DIR, variant=""):
+    """Cache file for source; variant separates snapshots made with different load options"""
+    key = f"{os.path.abspath(source)}|{variant}".encode("utf-8")
+    return os.path.join(cache_dir, hashlib.sha1(key).hexdigest() + ".snap")
+
+
+def source_info(source, sha256=None):
+    stat = os.stat(source)
+    return {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": sha256 or file_sha256(source),
+    }
+
+
+def write_snapshot(store, source, cache_dir=DEFAULT_CACHE_DIR, variant="", sha256=None, extra=None,
+                   extra_columns=None):
+    """Write store as the snapshot of source, returns the snapshot path
+
+    extra is any JSON data to keep in the header, e.g. the load reports,
+    and extra_columns more arrays named in COLUMN_FORMATS to store after the
+    store's own columns.
+    """
+    columns = store.columns()
+    columns.update(extra_columns or {})
+    header = {
+        "extra": extra,
+        "version": VERSION,
+        "byteorder": sys.byteorder,
+        "count": len(store),
+        "source": source_info(source, sha256),
+        "national_id_other": store._national_ids.other,
+        "phone_other": store._phones.other,
+        "columns": {},
+    }
+    offset = 0
+    for name, buffer in columns.items():
+        nbytes = memoryview(buffer).nbytes
+        header["columns"][name] = [offset, nbytes]
+        offset += (nbytes + 7) // 8 * 8
+
+    header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    header_bytes += b" " * (-(len(MAGIC) + 8 + len(header_bytes)) % 8)
+
+    path = snapshot_path(source, cache_dir, variant)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header_bytes)))
+        f.write(header_bytes)
+        for buffer in columns.values():
+            data = memoryview(buffer).cast("B")
+            f.write(data)
+            f.write(b"\0" * (-len(data) % 8))
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_header(f):
+    if f.read(len(MAGIC)) != MAGIC:
+        return None
+    (length,) = struct.unpack("<Q", f.read(8))
+    return json.loads(f.read(length).decode("utf-8")), len(MAGIC) + 8 + length
+
+
+def is_fresh(header, source):
+    """True when the snapshot was made from the current contents of source"""
+    if header.get("version") != VERSION or header.get("byteorder") != sys.byteorder:
+        return False
+    recorded = header["source"]
+    stat = os.stat(source)
+    if stat.st_size != recorded["size"]:
+        return False
+    if stat.st_mtime_ns == recorded["mtime_ns"]:
+        return True
+    # Same size but touched or copied: only the content hash can tell
+    return file_sha256(source) == recorded["sha256"]
+
+
+def load_snapshot(source, cache_dir=DEFAULT_CACHE_DIR, variant=""):
+    """Map the snapshot of source, returns (store, header) or None if there is no fresh one
+
+    Mapped extra columns of the snapshot are in header["extra_columns"].
+    """
+    path = snapshot_path(source, cache_dir, variant)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            parsed = read_header(f)
+            if parsed is None:
+                return None
+            header, data_start = parsed
+            if not is_fresh(header, source):
+                return None
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Ignoring participant snapshot {path}: {e}")
+        return None
+
+    view = memoryview(mapped)
+    columns = {}
+    for name, (offset, nbytes) in header["columns"].items():
+        start = data_start + offset
+        columns[name] = view[start:start + nbytes].cast(COLUMN_FORMATS[name])
+
+    def other(key):
+        return {int(i): value for i, value in header[key].items()}
+
+    store = ParticipantStore.from_columns(
+        columns["names"],
+        columns["name_offsets"],
+        DigitColumn(columns["national_id_values"], columns["national_id_lengths"], other("national_id_other")),
+        DigitColumn(columns["phone_values"], columns["phone_lengths"], other("phone_other")),
+        columns.get("weights"),
+    )
+    # The memoryviews keep the mapping alive for as long as the store exists
+    store.mapped = mapped
+    header["extra_columns"] = {name: column for name, column in columns.items() if name not in STORE_COLUMNS}
+    return store, header
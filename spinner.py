@@ -0,0 +1,45 @@
+"""Pre-rendered display strings for the spinner animation"""
+import random
+import threading
+
+RING_SIZE = 4096
+WARM_SIZE = 64
+
+
+class SpinnerFeed:
+    """Ring buffer of ready-to-show spinner texts
+
+    The texts are built from a random sample of the participants on a
+    background thread, so a spinner frame only has to take the next string:
+    no formatting or allocation per frame, and the cost does not depend on
+    how many participants there are.
+    """
+
+    def __init__(self, entries, size=RING_SIZE, rng=None):
+        self.entries = entries
+        self.size = size
+        self.rng = rng if rng is not None else random.Random()
+        self.pos = 0
+        # A small synchronous batch so the feed is usable right away
+        self.ring = self.render(min(WARM_SIZE, size))
+        self.ready = threading.Event()
+        threading.Thread(target=self._fill, daemon=True).start()
+
+    def render(self, count):
+        if not self.entries:
+            return [""]
+        return [
+            f"{name}\n{national_id} / {masked_phone}"
+            for name, national_id, _, masked_phone in self.rng.choices(self.entries, k=count)
+        ]
+
+    def _fill(self):
+        ring = self.render(self.size)
+        # Swapping the list reference is atomic, next() never sees a half-built ring
+        self.ring = ring
+        self.ready.set()
+
+    def next(self):
+        ring = self.ring
+        self.pos = (self.pos + 1) % len(ring)
+        return ring[self.pos]
@@ -0,0 +1,250 @@
+"""Compact column storage for participant entries"""
+import re
+from array import array
+from bisect import bisect
+from itertools import accumulate, compress, islice, repeat
+from operator import not_, sub
+
+from phones import mask_normalized
+
+# Up to 19 decimal digits fit in an unsigned 64-bit integer
+MAX_PACKED_DIGITS = 19
+PACKABLE_COLUMN = re.compile(r"(?:[0-9]{1,19}\n)*[0-9]{1,19}")
+# Weights are stored as unsigned 32-bit ticket counts
+MAX_WEIGHT = 2**32 - 1
+
+
+def dropped_indices(keep):
+    """Indices whose flag in keep is false, in order"""
+    return list(compress(range(len(keep)), map(not_, keep)))
+
+
+class DigitColumn:
+    """Digit strings packed as integers, keeping leading zeros
+
+    Each value takes 9 bytes (the number and its digit count). Values that are
+    not plain ASCII digits, or are too long to pack, are kept as strings in a
+    side dict.
+    """
+
+    def __init__(self, values=None, lengths=None, other=None):
+        # values and lengths may also be read-only memoryviews, see snapshot.py
+        self.values = values if values is not None else array('Q')
+        self.lengths = lengths if lengths is not None else array('B')
+        self.other = other if other is not None else {}
+
+    def __len__(self):
+        return len(self.values)
+
+    def append(self, text):
+        if text.isascii() and text.isdigit() and len(text) <= MAX_PACKED_DIGITS:
+            self.values.append(int(text))
+            self.lengths.append(len(text))
+            return
+        if text:
+            self.other[len(self.values)] = text
+        self.values.append(0)
+        self.lengths.append(0)
+
+    def extend(self, texts):
+        # One regex pass decides whether the whole chunk can take the fast path
+        if texts and PACKABLE_COLUMN.fullmatch("\n".join(texts)):
+            self.values.extend(map(int, texts))
+            self.lengths.extend(map(len, texts))
+            return
+        for text in texts:
+            self.append(text)
+
+    @staticmethod
+    def key(text):
+        """Integer identifying a packable value together with its digit count, or None"""
+        if text.isascii() and text.isdigit() and len(text) <= MAX_PACKED_DIGITS:
+            return int(text) << 5 | len(text)
+        return None
+
+    def indices_in(self, keys, texts=()):
+        """Indices of values whose key is in keys, or that are stored as text and in texts
+
+        The packed values are matched without building a string per value:
+        numbers are looked up first and only their hits check the digit count.
+        """
+        numbers = {key >> 5 for key in keys}
+        values, lengths = self.values, self.lengths
+        found = [
+            i for i in compress(range(len(values)), map(numbers.__contains__, values))
+            if values[i] << 5 | lengths[i] in keys
+        ]
+        if texts:
+            found.extend(i for i, text in self.other.items() if text in texts)
+        return found
+
+    def compress(self, keep):
+        """New column with only the values whose flag in keep is true"""
+        other = {}
+        if self.other:
+            # A kept value moves down by the number of values dropped before it
+            dropped = dropped_indices(keep)
+            other = {i - bisect(dropped, i): text for i, text in self.other.items() if keep[i]}
+        return DigitColumn(array('Q', compress(self.values, keep)), array('B', compress(self.lengths, keep)), other)
+
+    def __getitem__(self, i):
+        length = self.lengths[i]
+        if length == 0:
+            return self.other.get(i, "")
+        return f"{self.values[i]:0{length}d}"
+
+
+class ParticipantStore:
+    """Participants kept as columns instead of one tuple of strings each
+
+    Names share a single UTF-8 buffer indexed by offsets; national IDs and
+    phones are packed with DigitColumn. Indexing and iteration still give
+    (name, national_id, phone, masked_phone) tuples, built on access, so the
+    store can stand in for the list of entries the loader used to return.
+
+    weights is None (one ticket each) or an array with each entry's ticket
+    count, from the file's weight column or the weighted duplicate policy.
+    """
+
+    def __init__(self, entries=()):
+        self._names = bytearray()
+        self._name_offsets = array('Q', [0])
+        self._national_ids = DigitColumn()
+        self._phones = DigitColumn()
+        self.weights = None
+        self.extend(entries)
+
+    @classmethod
+    def from_columns(cls, names, name_offsets, national_ids, phones, weights=None):
+        """Build a store around existing buffers and DigitColumns, read-only if they are"""
+        store = cls.__new__(cls)
+        store._names = names
+        store._name_offsets = name_offsets
+        store._national_ids = national_ids
+        store._phones = phones
+        store.weights = weights
+        return store
+
+    def columns(self):
+        """The raw column buffers, in the order used by snapshot files"""
+        columns = {
+            "names": self._names,
+            "name_offsets": self._name_offsets,
+            "national_id_values": self._national_ids.values,
+            "national_id_lengths": self._national_ids.lengths,
+            "phone_values": self._phones.values,
+            "phone_lengths": self._phones.lengths,
+        }
+        if self.weights is not None:
+            columns["weights"] = self.weights
+        return columns
+
+    def __len__(self):
+        return len(self._national_ids)
+
+    def append(self, entry):
+        name, national_id, phone = entry[:3]
+        self._names += name.encode("utf-8")
+        self._name_offsets.append(len(self._names))
+        self._national_ids.append(national_id)
+        self._phones.append(phone)
+        if self.weights is not None:
+            self.weights.append(1)
+
+    def extend(self, entries):
+        for entry in entries:
+            self.append(entry)
+
+    def _extend_weights(self, added, weights):
+        """Keep weights as long as the other columns, called before they grow by added"""
+        if weights is None:
+            if self.weights is not None:
+                self.weights.extend(repeat(1, added))
+            return
+        if self.weights is None:
+            self.weights = array('I', repeat(1, len(self)))
+        self.weights.extend(weights)
+
+    def extend_columns(self, names, national_ids, phones, weights=None):
+        """Append a chunk given as equally long columns, weights may be None for one ticket each"""
+        self._extend_weights(len(national_ids), weights)
+        encoded = [name.encode("utf-8") for name in names]
+        # accumulate starts from the current end, which is already in the offsets
+        self._name_offsets.extend(islice(accumulate(map(len, encoded), initial=len(self._names)), 1, None))
+        self._names += b"".join(encoded)
+        self._national_ids.extend(national_ids)
+        self._phones.extend(phones)
+
+    def extend_store(self, other):
+        """Append every entry of another ParticipantStore"""
+        self._extend_weights(len(other), other.weights)
+        base = len(self)
+        name_base = len(self._names)
+        self._names += other._names
+        self._name_offsets.extend(name_base + offset for offset in other._name_offsets[1:])
+        for column, other_column in ((self._national_ids, other._national_ids), (self._phones, other._phones)):
+            column.values.extend(other_column.values)
+            column.lengths.extend(other_column.lengths)
+            column.other.update((base + i, text) for i, text in other_column.other.items())
+
+    def compress(self, keep):
+        """New store with only the entries whose flag in keep is true
+
+        Works on the column arrays as a whole: names are copied as the runs of
+        bytes between dropped entries, so the cost in Python grows with the
+        number of dropped entries rather than the number of entries.
+        """
+        offsets = self._name_offsets
+        names = bytearray()
+        start = 0
+        for i in dropped_indices(keep):
+            names += self._names[offsets[start]:offsets[i]]
+            start = i + 1
+        names += self._names[offsets[start]:offsets[len(self)]]
+        name_lengths = map(sub, islice(offsets, 1, None), offsets)
+        name_offsets = array('Q', accumulate(compress(name_lengths, keep), initial=0))
+        weights = None
+        if self.weights is not None:
+            weights = array('I', compress(self.weights, keep))
+        return ParticipantStore.from_columns(
+            names, name_offsets, self._national_ids.compress(keep), self._phones.compress(keep), weights
+        )
+
+    def weight(self, i):
+        return 1 if self.weights is None else self.weights[i]
+
+    def name(self, i):
+        return str(self._names[self._name_offsets[i]:self._name_offsets[i + 1]], "utf-8")
+
+    def national_id(self, i):
+        return self._national_ids[i]
+
+    def phone(self, i):
+        return self._phones[i]
+
+    def national_id_indices(self, keys, texts=()):
+        """Indices of entries whose national ID is in keys (see DigitColumn.key) or texts"""
+        return self._national_ids.indices_in(keys, texts)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("participant index out of range")
+        phone = self._phones[i]
+        return (self.name(i), self._national_ids[i], phone, mask_normalized(phone))
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def nbytes(self):
+        """Approximate memory used by the columns"""
+        columns = (self._national_ids, self._phones)
+        return (
+            len(self._names)
+            + self._name_offsets.itemsize * len(self._name_offsets)
+            + sum(c.values.itemsize * len(c.values) + len(c.lengths) for c in columns)
+        )
@@ -0,0 +1,121 @@
+"""Paginated, searchable browser for the winner registry"""
+import time
+import tkinter as tk
+from tkinter import ttk
+
+PAGE_SIZE = 50
+# Wait this long after the last keystroke before searching
+SEARCH_DELAY_MS = 120
+
+
+class WinnersBrowser(tk.Toplevel):
+    """Window listing past winners one page at a time
+
+    Only the current page is fetched from the registry and shown, so opening
+    the window and paging cost the same for 50 or 500,000 winners. Results
+    follow the search box while the user is typing.
+    """
+
+    COLUMNS = (
+        ("name", "نام", 220),
+        ("national_id", "کد ملی", 120),
+        ("masked_phone", "شماره موبایل (مخفی)", 140),
+        ("drawn_at", "تاریخ قرعه‌کشی", 150),
+    )
+
+    def __init__(self, parent, registry, bg_color, fg_color, text_bg):
+        super().__init__(parent)
+        self.registry = registry
+        self.query = ""
+        self.page = 0
+        self.total = 0
+        self.pending = None
+        self.title("لیست برندگان قبلی")
+        self.geometry("700x500")
+        self.configure(bg=bg_color)
+
+        search_frame = tk.Frame(self, bg=bg_color)
+        search_frame.pack(fill=tk.X, padx=10, pady=(10, 5))
+        tk.Label(
+            search_frame,
+            text="جستجو (نام، کد ملی یا شماره مخفی):",
+            font=('B Titr', 11),
+            bg=bg_color,
+            fg=fg_color
+        ).pack(side=tk.RIGHT)
+        self.search_var = tk.StringVar()
+        search_entry = tk.Entry(
+            search_frame,
+            textvariable=self.search_var,
+            font=('B Titr', 12),
+            bg=text_bg,
+            fg=fg_color,
+            insertbackground=fg_color,
+            justify="right"
+        )
+        search_entry.pack(side=tk.RIGHT, fill=tk.X, expand=True, padx=5)
+        search_entry.focus_set()
+        self.search_var.trace_add("write", lambda *args: self.schedule_search())
+
+        table_frame = tk.Frame(self, bg=bg_color)
+        table_frame.pack(fill=tk.BOTH, expand=True, padx=10)
+        self.table = ttk.Treeview(
+            table_frame,
+            columns=[name for name, _, _ in self.COLUMNS],
+            show="headings",
+            height=PAGE_SIZE
+        )
+        for name, heading, width in self.COLUMNS:
+            self.table.heading(name, text=heading)
+            self.table.column(name, width=width, anchor="center")
+        scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=self.table.yview)
+        self.table.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.LEFT, fill=tk.Y)
+        self.table.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True)
+
+        nav_frame = tk.Frame(self, bg=bg_color)
+        nav_frame.pack(fill=tk.X, padx=10, pady=10)
+        self.next_btn = ttk.Button(nav_frame, text="صفحه بعد ◀", command=lambda: self.show_page(self.page + 1))
+        self.next_btn.pack(side=tk.LEFT)
+        self.prev_btn = ttk.Button(nav_frame, text="▶ صفحه قبل", command=lambda: self.show_page(self.page - 1))
+        self.prev_btn.pack(side=tk.RIGHT)
+        self.page_label = tk.Label(nav_frame, font=('B Titr', 11), bg=bg_color, fg=fg_color)
+        self.page_label.pack(side=tk.TOP)
+        ttk.Button(nav_frame, text="بستن", command=self.destroy).pack(side=tk.TOP, pady=(5, 0))
+
+        self.bind("<Prior>", lambda e: self.show_page(self.page - 1))
+        self.bind("<Next>", lambda e: self.show_page(self.page + 1))
+        self.bind("<Escape>", lambda e: self.destroy())
+        self.show_page(0)
+
+    @property
+    def page_count(self):
+        return max(1, -(-self.total // PAGE_SIZE))
+
+    def schedule_search(self):
+        """Search shortly after typing pauses, so fast typing runs one query"""
+        if self.pending is not None:
+            self.after_cancel(self.pending)
+        self.pending = self.after(SEARCH_DELAY_MS, self.search)
+
+    def search(self):
+        self.pending = None
+        self.query = self.search_var.get()
+        self.show_page(0)
+
+    def show_page(self, page):
+        if page < 0 or (page > 0 and page >= self.page_count):
+            return
+        start = time.perf_counter()
+        self.total, rows = self.registry.search(self.query, page * PAGE_SIZE, PAGE_SIZE)
+        elapsed = (time.perf_counter() - start) * 1000
+        self.page = page
+
+        self.table.delete(*self.table.get_children())
+        for row in rows:
+            self.table.insert("", tk.END, values=row)
+        self.prev_btn.state(["!disabled"] if page > 0 else ["disabled"])
+        self.next_btn.state(["!disabled"] if page + 1 < self.page_count else ["disabled"])
+        self.page_label.config(
+            text=f"صفحه {page + 1} از {self.page_count} - {self.total} برنده ({elapsed:.0f} میلی‌ثانیه)"
+        )
@@ -0,0 +1,138 @@
+"""Virtualized display of drawn winners for the fullscreen lottery popup"""
+import tkinter as tk
+from tkinter import font as tkfont
+
+
+def font_size_for(winner_count):
+    """Font size tier used for the winner cards"""
+    if winner_count <= 3:
+        return 40
+    elif winner_count <= 6:
+        return 30
+    elif winner_count <= 10:
+        return 24
+    elif winner_count <= 20:
+        return 18
+    return 14
+
+
+class WinnersView(tk.Frame):
+    """Scrollable column of winner cards drawn on a single Canvas
+
+    Only the cards that intersect the visible area exist as canvas items, so
+    building and scrolling cost the same for 5 or 5,000 winners.
+    """
+
+    CARD_GAP = 10
+    CARD_PADX = 20
+    CARD_PADY = 10
+
+    def __init__(self, parent, winners, winner_bg, winner_fg, highlight_color, bg='black'):
+        super().__init__(parent, bg=bg)
+        self.winners = winners
+        self.winner_bg = winner_bg
+        self.winner_fg = winner_fg
+        self.highlight_color = highlight_color
+        self.offset = 0
+
+        self.title_font = tkfont.Font(family="B Titr")
+        self.detail_font = tkfont.Font(family="B Titr")
+        self._measure()
+
+        self.canvas = tk.Canvas(self, bg=bg, highlightthickness=0)
+        self.scrollbar = tk.Scrollbar(self, orient="vertical", command=self.yview)
+        self.canvas.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+
+        self.canvas.bind("<Configure>", lambda e: self.redraw())
+        for widget in (self.canvas, self.scrollbar):
+            widget.bind("<MouseWheel>", self.on_mousewheel)
+            widget.bind("<Button-4>", lambda e: self.scroll_by(-self.row_height))
+            widget.bind("<Button-5>", lambda e: self.scroll_by(self.row_height))
+
+    def _measure(self):
+        font_size = font_size_for(len(self.winners))
+        if self.title_font.cget("size") != font_size:
+            self.title_font.configure(size=font_size)
+            self.detail_font.configure(size=font_size - 4)
+        self.title_height = self.title_font.metrics("linespace")
+        self.detail_height = self.detail_font.metrics("linespace")
+        self.card_height = self.title_height + 2 * self.detail_height + 2 * self.CARD_PADY
+        self.row_height = self.card_height + 2 * self.CARD_GAP
+
+    def set_winners(self, winners):
+        """Show another draw's winners in the same view, scrolled to the top"""
+        self.winners = winners
+        self.offset = 0
+        self._measure()
+        self.redraw()
+
+    @property
+    def total_height(self):
+        return len(self.winners) * self.row_height
+
+    def max_offset(self):
+        return max(0, self.total_height - self.canvas.winfo_height())
+
+    def scroll_to(self, offset):
+        self.offset = min(max(0, int(offset)), self.max_offset())
+        self.redraw()
+
+    def scroll_by(self, pixels):
+        self.scroll_to(self.offset + pixels)
+
+    def yview(self, *args):
+        """Scrollbar command, mirrors the Canvas.yview protocol"""
+        if args[0] == "moveto":
+            self.scroll_to(float(args[1]) * self.total_height)
+        elif args[0] == "scroll":
+            step = self.canvas.winfo_height() if args[2] == "pages" else self.row_height
+            self.scroll_by(int(args[1]) * step)
+
+    def on_mousewheel(self, event):
+        self.scroll_by(-self.row_height if event.delta > 0 else self.row_height)
+
+    def redraw(self):
+        canvas = self.canvas
+        canvas.delete("row")
+        width = canvas.winfo_width()
+        height = canvas.winfo_height()
+        total = self.total_height
+        self.offset = min(self.offset, self.max_offset())
+
+        # Few winners are centered vertically like the old frame-based layout
+        top = (height - total) // 2 if total < height else -self.offset
+        first = max(0, -top // self.row_height)
+        last = min(len(self.winners), (height - top) // self.row_height + 1)
+
+        card_width = max(width * 0.6, 200)
+        x0 = (width - card_width) / 2
+        x1 = x0 + card_width
+        center = width / 2
+        for i in range(first, last):
+            name, national_id, _, masked_phone = self.winners[i]
+            y = top + i * self.row_height + self.CARD_GAP
+            canvas.create_rectangle(
+                x0, y, x1, y + self.card_height,
+                fill=self.winner_bg, outline=self.highlight_color, width=2, tags="row"
+            )
+            y += self.CARD_PADY
+            canvas.create_text(
+                center, y, text=f"🏆 {name}", font=self.title_font,
+                fill=self.highlight_color, anchor="n", tags="row"
+            )
+            y += self.title_height
+            canvas.create_text(
+                center, y, text=f"کد ملی: {national_id}", font=self.detail_font,
+                fill=self.winner_fg, anchor="n", tags="row"
+            )
+            y += self.detail_height
+            canvas.create_text(
+                center, y, text=f"تلفن: {masked_phone}", font=self.detail_font,
+                fill=self.winner_fg, anchor="n", tags="row"
+            )
+
+        if total > 0 and total > height:
+            self.scrollbar.set(self.offset / total, (self.offset + height) / total)
+        else:
+            self.scrollbar.set(0, 1)